@@ -0,0 +1 @@
+# Necessary for the benchmarks to be run as modules (python -m benchmarks.<name>)
\ No newline at end of file
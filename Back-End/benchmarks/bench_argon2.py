@@ -0,0 +1,41 @@
+# Benchmark of Argon2 parameters to pick ARGON2_TIME_COST, ARGON2_MEMORY_COST and ARGON2_PARALLELISM for the deployment hardware
+# Run from the Back-End folder: python -m benchmarks.bench_argon2 [--repeat 5]
+# It prints the mean time of one hash per combination, OWASP suggests keeping it well under a second (ideally < 100 ms)
+# A verification costs the same as a hash, so logins per second per worker is about 1000 / ms
+import argparse
+import itertools
+import time
+
+from passlib.context import CryptContext
+
+from config.settings import ARGON2_TIME_COST, ARGON2_MEMORY_COST, ARGON2_PARALLELISM
+
+def hash_ms(time_cost: int, memory_cost: int, parallelism: int, repeat: int) -> float:
+    context = CryptContext(
+        schemes=["argon2"],
+        argon2__time_cost=time_cost,
+        argon2__memory_cost=memory_cost,
+        argon2__parallelism=parallelism,
+    )
+    context.hash("benchmark-password") # Warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        context.hash("benchmark-password")
+    return (time.perf_counter() - start) / repeat * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--time-cost", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--memory-cost", type=int, nargs="+", default=[19456, 47104, 65536, 102400])
+    parser.add_argument("--parallelism", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+
+    print(f"Current settings: time_cost={ARGON2_TIME_COST} memory_cost={ARGON2_MEMORY_COST} parallelism={ARGON2_PARALLELISM}")
+    print(f"{'time_cost':>9} {'memory_cost (KiB)':>18} {'parallelism':>11} {'hash (ms)':>10}")
+    for time_cost, memory_cost, parallelism in itertools.product(args.time_cost, args.memory_cost, args.parallelism):
+        ms = hash_ms(time_cost, memory_cost, parallelism, args.repeat)
+        print(f"{time_cost:>9} {memory_cost:>18} {parallelism:>11} {ms:>10.1f}")
+
+if __name__ == "__main__":
+    main()
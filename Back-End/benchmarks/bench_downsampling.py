@@ -0,0 +1,34 @@
+# Benchmark of the chart downsampling in services/downsampling.py
+# Run from the Back-End folder: python -m benchmarks.bench_downsampling [--points 500]
+# For growing histories it prints the time to downsample one series and the JSON size of the full vs the downsampled series
+import argparse
+import json
+import time
+
+import numpy as np
+
+from services.downsampling import DOWNSAMPLING_METHODS, downsample
+
+def series_json_bytes(rounds: np.ndarray, values: np.ndarray) -> int:
+    return len(json.dumps({"rounds": rounds.tolist(), "values": values.tolist()}))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, default=500)
+    parser.add_argument("--rounds", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'rounds':>8} {'method':>7} {'time (ms)':>10} {'full (KB)':>10} {'downsampled (KB)':>17}")
+    for count in args.rounds:
+        rounds = np.arange(1, count + 1)
+        values = np.clip(1 - np.exp(-rounds / (count / 5)) + np.random.default_rng(0).normal(0, 0.02, count), 0, 1)
+        for method in DOWNSAMPLING_METHODS:
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                kept = downsample(rounds, values, args.points, method)
+            elapsed = (time.perf_counter() - start) / args.repeat * 1000
+            print(f"{count:>8} {method:>7} {elapsed:>10.2f} {series_json_bytes(rounds, values) / 1024:>10.1f} {series_json_bytes(rounds[kept], values[kept]) / 1024:>17.1f}")
+
+if __name__ == "__main__":
+    main()
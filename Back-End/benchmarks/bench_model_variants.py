@@ -0,0 +1,53 @@
+# Benchmark of the inference backends in services/model_variants.py
+# Run from the Back-End folder: python -m benchmarks.bench_model_variants [--weights model.pth] [--batch 1 8]
+# Without --weights a randomly initialized ClientModel is used, which is enough to compare latency and memory
+# It prints parity with fp32, the mean forward pass latency per batch size and the size of the weights
+import argparse
+import io
+import time
+
+import torch
+
+from models.ClientModel import ClientModel
+from services.model_variants import MODEL_VARIANTS, build_variant, check_parity, parity_inputs
+
+# Size of the serialized variant, a good proxy for the weights held in memory
+def serialized_mb(model) -> float:
+    buffer = io.BytesIO()
+    if isinstance(model, torch.jit.ScriptModule):
+        torch.jit.save(model, buffer)
+    else:
+        torch.save(model.state_dict(), buffer)
+    return len(buffer.getvalue()) / 1024 / 1024
+
+def latency_ms(model, batch_size: int, repeat: int) -> float:
+    inputs = parity_inputs(batch_size)
+    with torch.no_grad():
+        model(inputs) # Warm up
+        start = time.perf_counter()
+        for _ in range(repeat):
+            model(inputs)
+    return (time.perf_counter() - start) / repeat * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--weights", help="Path to a state dict saved with torch.save")
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    reference = ClientModel()
+    if args.weights:
+        reference.load_state_dict(torch.load(args.weights, map_location="cpu"))
+    reference.eval()
+
+    latency_headers = "".join(f"{f'batch {size} (ms)':>15}" for size in args.batch)
+    print(f"{'backend':<18} {'agreement':>9} {'max prob diff':>14} {'weights (MB)':>13}{latency_headers}")
+    for variant in MODEL_VARIANTS:
+        model = build_variant(reference, variant)
+        parity = check_parity(reference, model)
+        latencies = "".join(f"{latency_ms(model, size, args.repeat):>15.1f}" for size in args.batch)
+        print(f"{variant:<18} {parity['agreement']:>9.2f} {parity['max_prob_diff']:>14.5f} {serialized_mb(model):>13.1f}{latencies}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# Benchmark of image preprocessing: the original torchvision transform vs services/preprocessing.py
+# Run from the Back-End folder: python -m benchmarks.bench_preprocessing [--repeat 20]
+# It prints the mean time per image for each input and the largest difference between the two outputs
+import argparse
+import io
+import time
+
+import torch
+import torchvision.transforms as transforms
+from PIL import Image
+
+from services.preprocessing import preprocess_image
+
+# The transform that routes/predict.py used before services/preprocessing.py
+legacy_transform = transforms.Compose([
+    transforms.Resize((224, 224)),
+    transforms.ToTensor(),
+    transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
+])
+
+def legacy_preprocess(data: bytes):
+    image = Image.open(io.BytesIO(data)).convert("RGB")
+    return legacy_transform(image), image.size
+
+# Synthetic microscopy-like image (smooth gradients with some noise) encoded in the given format
+def synthetic_image(width: int, height: int, image_format: str) -> bytes:
+    x = torch.linspace(0, 1, width).unsqueeze(0).expand(height, width)
+    y = torch.linspace(0, 1, height).unsqueeze(1).expand(height, width)
+    channels = torch.stack([x, y, (x + y) / 2], dim=2) * 200 + torch.rand(height, width, 3) * 55
+    image = Image.fromarray(channels.to(torch.uint8).numpy(), "RGB")
+    buffer = io.BytesIO()
+    if image_format == "JPEG":
+        image.save(buffer, format=image_format, quality=90)
+    else:
+        image.save(buffer, format=image_format)
+    return buffer.getvalue()
+
+def time_per_image(fn, data: bytes, repeat: int) -> float:
+    fn(data) # Warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(data)
+    return (time.perf_counter() - start) / repeat * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    inputs = {
+        "test image (tests/WBC-Benign-001_test.jpg)": open("tests/WBC-Benign-001_test.jpg", "rb").read(),
+        "JPEG 1024x768": synthetic_image(1024, 768, "JPEG"),
+        "JPEG 4000x3000": synthetic_image(4000, 3000, "JPEG"),
+        "PNG 2048x1536": synthetic_image(2048, 1536, "PNG"),
+    }
+
+    print(f"{'input':<45} {'transform (ms)':>15} {'fast path (ms)':>15} {'speedup':>8} {'max diff':>9}")
+    for name, data in inputs.items():
+        legacy_ms = time_per_image(legacy_preprocess, data, args.repeat)
+        fast_ms = time_per_image(preprocess_image, data, args.repeat)
+        difference = (legacy_preprocess(data)[0] - preprocess_image(data)[0]).abs().max().item()
+        print(f"{name:<45} {legacy_ms:>15.2f} {fast_ms:>15.2f} {legacy_ms / fast_ms:>7.1f}x {difference:>9.3f}")
+
+if __name__ == "__main__":
+    main()
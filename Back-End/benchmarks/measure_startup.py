@@ -0,0 +1,45 @@
+# Measures how long it takes to import the app (main.py) and the peak memory (RSS) of the process,
+# with the inference subsystem enabled and disabled (ENABLE_INFERENCE)
+# Run from the Back-End folder: python -m benchmarks.measure_startup [--runs 5]
+# Each run is a fresh Python process, so nothing is cached between runs (except by the OS)
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Code run in the child process: import the app and report the import time, peak RSS and whether torch was loaded
+CHILD = """
+import json, resource, sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # Kilobytes on Linux
+print(json.dumps({"seconds": elapsed, "rss_mb": peak_kb / 1024, "torch_loaded": "torch" in sys.modules}))
+"""
+
+def measure(enable_inference: bool, runs: int) -> dict:
+    env = {**os.environ, "ENABLE_INFERENCE": "true" if enable_inference else "false", "PRELOAD_MODEL": "false"}
+    results = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", CHILD], env=env, capture_output=True, text=True, check=True)
+        results.append(json.loads(output.stdout.strip().splitlines()[-1]))
+    return {
+        "seconds": statistics.median(result["seconds"] for result in results),
+        "rss_mb": statistics.median(result["rss_mb"] for result in results),
+        "torch_loaded": results[0]["torch_loaded"],
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'ENABLE_INFERENCE':<18} {'import time (s)':>16} {'peak RSS (MB)':>14} {'torch loaded':>13}   (median of {args.runs} runs)")
+    for enable_inference in (False, True):
+        result = measure(enable_inference, args.runs)
+        print(f"{str(enable_inference).lower():<18} {result['seconds']:>16.2f} {result['rss_mb']:>14.0f} {str(result['torch_loaded']):>13}")
+
+if __name__ == "__main__":
+    main()
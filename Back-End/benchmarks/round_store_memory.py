@@ -0,0 +1,96 @@
+# Memory footprint and query latency of the columnar round store (services/round_store.py)
+# Run from the Back-End folder: python -m benchmarks.round_store_memory [--rounds 10000] [--clients 100]
+# The store is filled with random metrics (no database needed), then each analytics query is timed
+# The reload is measured separately: ClientMetrics documents are generated one at a time by a stand-in collection,
+# and tracemalloc reports the peak memory of _reload (arrays plus the documents held while loading)
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+import numpy as np
+
+from services.round_store import METRICS, RoundStore, best_k, rank_descending, rolling_mean
+
+# Fill a store the same way _reload does, with every client present in every round
+def filled_store(rounds: int, clients: int) -> RoundStore:
+    store = RoundStore()
+    store._reset(rounds, clients + 1)
+    store._round_numbers[:] = np.arange(1, rounds + 1)
+    store.count = rounds
+    store.client_ids = ["Global"] + [f"client_{index}" for index in range(clients)]
+    store.client_index = {client_id: column for column, client_id in enumerate(store.client_ids)}
+    store._values[:] = np.random.default_rng(0).random(store._values.shape)
+    return store
+
+# Stand-in for the ClientMetrics collection, the documents are generated as the cursor is read like Motor would return them
+class GeneratedClientMetrics:
+    def __init__(self, rounds: int, clients: int):
+        self.rounds = rounds
+        self.client_ids = ["Global"] + [f"client_{index}" for index in range(clients)]
+
+    async def distinct(self, field: str) -> list:
+        return list(range(1, self.rounds + 1)) if field == "round_number" else list(self.client_ids)
+
+    def find(self, query: dict, projection: dict):
+        return self
+
+    def batch_size(self, size: int):
+        return self
+
+    async def __aiter__(self):
+        generator = np.random.default_rng(0)
+        for round_number in range(1, self.rounds + 1):
+            for client_id in self.client_ids:
+                yield {"client_id": client_id, "round_number": round_number, "metrics": dict(zip(METRICS, generator.random(len(METRICS)).tolist()))}
+
+# Time (s) of a full reload, then its peak memory (MB) in a second run under tracemalloc (which slows it down)
+def measure_reload(rounds: int, clients: int) -> tuple[float, float]:
+    db = {"ClientMetrics": GeneratedClientMetrics(rounds, clients)}
+    start = time.perf_counter()
+    asyncio.run(RoundStore()._reload(db, 1))
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    asyncio.run(RoundStore()._reload(db, 1))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024
+
+def time_us(fn, repeat: int) -> float:
+    fn() # Warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=10000)
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+
+    store = filled_store(args.rounds, args.clients)
+    f1 = METRICS.index("f1")
+    global_f1 = store.values[:, 0, f1]
+    last_f1 = store.values[-1, 1:, f1]
+    queries = {
+        "rolling mean (window 10)": lambda: rolling_mean(global_f1, 10),
+        "rank of the clients": lambda: rank_descending(last_f1),
+        "best 5 rounds": lambda: best_k(global_f1, 5),
+        "deltas vs previous round": lambda: store.values[-1, :, f1] - store.values[-2, :, f1],
+        "append one round": lambda: store._append_row(int(store.round_numbers[-1]) + 1),
+    }
+
+    cells = store.values.shape[0] * store.values.shape[1] * store.values.shape[2]
+    print(f"{args.rounds} rounds x {args.clients} clients (+ Global) x {len(METRICS)} metrics = {cells} float64 values")
+    print(f"memory: {store.nbytes() / 1024 / 1024:.1f} MB ({store._values.shape[0]} rows allocated)")
+    reload_seconds, peak_mb = measure_reload(args.rounds, args.clients)
+    print(f"reload: {reload_seconds:.1f} s, peak memory {peak_mb:.1f} MB (batches of {RoundStore().load_batch_size} documents, documents generated on the fly)")
+    print(f"{'query':<28} {'time (us)':>10}")
+    for name, query in queries.items():
+        print(f"{name:<28} {time_us(query, args.repeat):>10.1f}")
+
+if __name__ == "__main__":
+    main()
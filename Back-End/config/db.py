@@ -1,9 +1,15 @@
 from motor.motor_asyncio import AsyncIOMotorClient # Asynchronous MongoDB client
 import os
+import logging
 from dotenv import load_dotenv # For loading environment variables from .env file
+from config.indexes import ensure_indexes # Index management for the collections
+from config.settings import ENSURE_INDEXES
+from services.round_ingestion import backfill_client_metrics # ClientMetrics of rounds stored before it existed
 
 load_dotenv()  # Load environment variables from .env file
 
+logger = logging.getLogger("app")
+
 # Class for MongoDB connection
 class MongoDB:
     def __init__(self):
@@ -30,6 +36,15 @@ async def open_connection():
     mongodb.client = AsyncIOMotorClient(mongo_uri)
     mongodb.set_db(mongodb.client[db_name]) 
 
+    # Create missing indexes so the lookups by token, username, model name and round do not scan the collections
+    # and fill ClientMetrics if it is still empty
+    if ENSURE_INDEXES:
+        await ensure_indexes(mongodb.db)
+        try:
+            await backfill_client_metrics(mongodb.db)
+        except Exception as e:
+            logger.warning(f"Could not fill ClientMetrics from the existing rounds: {e}")
+
 # Function to close the connection to the MongoDB database
 async def close_connection():
     if mongodb.client:
@@ -0,0 +1,49 @@
+from pymongo import ASCENDING, DESCENDING, IndexModel
+import logging
+
+logger = logging.getLogger("app")
+
+# Indexes of every collection, created on startup by ensure_indexes()
+# create_indexes() is a no-op for indexes that already exist, so this is safe to run on every start
+INDEXES = {
+    "Sessions": [
+        IndexModel([("token", ASCENDING)], unique=True, name="token_unique"), # get_session, logout
+        IndexModel([("user_id", ASCENDING)], name="user_id"), # delete_many of the previous sessions on login
+        IndexModel([("expires", ASCENDING)], expireAfterSeconds=0, name="expires_ttl"), # MongoDB removes expired sessions
+    ],
+    "Users": [
+        IndexModel([("username", ASCENDING)], unique=True, name="username_unique"), # login, register
+    ],
+    "models": [
+        IndexModel([("model_name", ASCENDING), ("_id", DESCENDING)], name="model_name_latest"), # Latest model by name
+    ],
+    "Rounds": [
+        IndexModel([("round_number", ASCENDING)], unique=True, name="round_number_unique"), # Numeric round, "round" is stored as a string, upserts by round
+    ],
+    "ClientMetrics": [
+        IndexModel([("client_id", ASCENDING), ("round_number", ASCENDING)], unique=True, name="client_round_unique"), # Rounds of one client, list of clients
+        IndexModel([("round_number", ASCENDING)], name="round_clients"), # Clients of one round, when a round is replaced
+    ],
+}
+
+# Create the indexes of one collection (also used for staging collections before they are renamed)
+async def ensure_collection_indexes(collection, name: str = None):
+    await collection.create_indexes(INDEXES[name or collection.name])
+
+# Create the missing indexes of every collection
+# A failure (eg. duplicate usernames preventing the unique index) is logged and does not stop the app
+async def ensure_indexes(db):
+    try:
+        # Rounds stored before round_number existed get it from their string round number
+        await db["Rounds"].update_many(
+            {"round_number": {"$exists": False}},
+            [{"$set": {"round_number": {"$toInt": "$round"}}}],
+        )
+    except Exception as e:
+        logger.warning(f"Could not add round_number to the existing rounds: {e}")
+
+    for name in INDEXES:
+        try:
+            await ensure_collection_indexes(db[name], name)
+        except Exception as e:
+            logger.warning(f"Could not create the indexes of {name}: {e}")
@@ -0,0 +1,97 @@
+import os
+from dotenv import load_dotenv # For loading environment variables from .env file
+
+load_dotenv()  # Load environment variables from .env file
+
+# Tunable settings for the backend, read once from the environment
+# Every setting has a default so the app runs without any of them set
+
+# Model registry (routes/predict.py)
+MODEL_NAME = os.getenv("MODEL_NAME", "my_model") # Name of the model in the models collection
+MODEL_CHECK_INTERVAL = float(os.getenv("MODEL_CHECK_INTERVAL", "10")) # Seconds between checks for a newer model upload
+
+# Micro-batching of predictions (services/batcher.py)
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "16")) # Most images run through the model in one forward pass
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "5")) # How long the first image of a batch waits for others
+
+# Inference thread pool (services/batcher.py)
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2")) # Threads running preprocessing and forward passes
+INFERENCE_MAX_PENDING = int(os.getenv("INFERENCE_MAX_PENDING", "32")) # Predictions admitted at once, more get a 503
+INFERENCE_TORCH_THREADS = int(os.getenv("INFERENCE_TORCH_THREADS", "0")) # Intra-op threads for torch, 0 = CPU count / 2
+
+# Uploads for predictions (routes/predict.py, services/uploads.py)
+MAX_IMAGE_BYTES = int(os.getenv("MAX_IMAGE_BYTES", str(20 * 1024 * 1024))) # Largest single image accepted
+BATCH_UPLOAD_MAX_FILES = int(os.getenv("BATCH_UPLOAD_MAX_FILES", "1000")) # Most images in one /predict/batch request
+MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", str(8000 * 8000))) # Largest width * height accepted, checked from the header
+
+# Inference backend (services/model_variants.py)
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "fp32") # fp32, int8, torchscript or int8-torchscript
+
+# Prediction result cache (services/prediction_cache.py)
+PREDICTION_CACHE_MAX_ENTRIES = int(os.getenv("PREDICTION_CACHE_MAX_ENTRIES", "1024")) # 0 disables the cache
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "3600")) # Seconds an entry is kept, 0 = until evicted
+
+# Startup (main.py)
+ENABLE_INFERENCE = os.getenv("ENABLE_INFERENCE", "true").lower() in ("1", "true", "yes") # false for dashboard-only replicas (no torch)
+PRELOAD_MODEL = os.getenv("PRELOAD_MODEL", "true").lower() in ("1", "true", "yes") # Load and warm the model at startup
+PRELOAD_RETRY_INTERVAL = float(os.getenv("PRELOAD_RETRY_INTERVAL", "30")) # Seconds between preload attempts if it fails
+
+# Session lookup cache (routes/auth.py)
+# With several workers a logout only clears the cache of the worker that handled it,
+# so the TTL bounds how long a logged out session can still be accepted by the others
+SESSION_CACHE_MAX_ENTRIES = int(os.getenv("SESSION_CACHE_MAX_ENTRIES", "10000")) # 0 disables the cache
+SESSION_CACHE_TTL = float(os.getenv("SESSION_CACHE_TTL", "30")) # Seconds a validated session is trusted without the database
+
+# MongoDB indexes (config/indexes.py)
+ENSURE_INDEXES = os.getenv("ENSURE_INDEXES", "true").lower() in ("1", "true", "yes") # Create missing indexes on startup
+
+# Session expiry (routes/auth.py)
+# Expired sessions are removed by the TTL index on Sessions.expires, the sweeper is for deployments without TTL support
+SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", "0")) # Seconds between sweeps, 0 = no sweeper
+
+# Password hashing (services/passwords.py)
+# Argon2 parameters, measure them on the deployment hardware with: python -m benchmarks.bench_argon2
+# The defaults are the argon2_cffi 21.1.0 defaults that existing hashes were made with
+# Changing them rehashes each user's password on their next login
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "2")) # Iterations
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "102400")) # KiB of memory per hash
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "8")) # Lanes (threads) per hash
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2")) # Hashes computed at the same time
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "16")) # Hashes admitted at once, more get a 503
+
+# Rate limiting (rateLimiter.py)
+# memory:// keeps the counters in each worker, so with several workers the limits are multiplied by the worker count
+# Shared storages: sqlite:///path/to/file.db (workers on the same host, services/rate_limit_storage.py) or redis://host:6379 (needs the redis package)
+RATE_LIMIT_STORAGE_URI = os.getenv("RATE_LIMIT_STORAGE_URI", "memory://")
+RATE_LIMIT_STRATEGY = os.getenv("RATE_LIMIT_STRATEGY", "sliding-window-counter") # sliding-window-counter, fixed-window or moving-window (not with sqlite)
+
+# Streaming round ingestion (POST /api/post/stream, services/round_ingestion.py)
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "500")) # Rounds validated and written together
+INGEST_MAX_LINE_BYTES = int(os.getenv("INGEST_MAX_LINE_BYTES", str(1024 * 1024))) # Largest NDJSON line (one round) accepted
+INGEST_MAX_REPORTED_ERRORS = int(os.getenv("INGEST_MAX_REPORTED_ERRORS", "20")) # Invalid lines listed in the summary, the others are only counted
+
+# Round summary (services/round_summary.py)
+# Pushes handled by another worker are picked up after at most this many seconds (the summary checks the rounds version)
+ROUND_SUMMARY_CHECK_INTERVAL = float(os.getenv("ROUND_SUMMARY_CHECK_INTERVAL", "5"))
+ROUND_STORE_LOAD_BATCH = int(os.getenv("ROUND_STORE_LOAD_BATCH", "5000")) # ClientMetrics documents held at once when the round store (services/round_store.py) is loaded
+
+# Round listings (/api/get, /api/rounds/{client_id})
+ROUNDS_PAGE_SIZE = int(os.getenv("ROUNDS_PAGE_SIZE", "500")) # Rounds per page when no limit is given
+ROUNDS_PAGE_MAX = int(os.getenv("ROUNDS_PAGE_MAX", "5000")) # Largest limit accepted
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500")) # Rounds read from the cursor and written per chunk by /api/export
+
+# Chart data (/api/chart, services/downsampling.py)
+CHART_DEFAULT_POINTS = int(os.getenv("CHART_DEFAULT_POINTS", "500")) # Points per series when none are requested
+CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", "5000")) # Largest number of points per series accepted
+CHART_MAX_CLIENTS = int(os.getenv("CHART_MAX_CLIENTS", "50")) # Largest number of clients (series groups) per request
+
+# Round events (GET /api/events, services/events.py)
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "32")) # Events buffered per dashboard, a dashboard that falls further behind is told to reload
+EVENTS_MAX_SUBSCRIBERS = int(os.getenv("EVENTS_MAX_SUBSCRIBERS", "200")) # Open event streams per worker, more get a 503
+EVENTS_KEEPALIVE = float(os.getenv("EVENTS_KEEPALIVE", "15")) # Seconds between keepalive comments, also how soon a closed connection is noticed
+
+# Response compression (main.py, services/compression.py)
+# br is used when the brotli package is installed and the client accepts it, gzip otherwise
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024")) # Smaller responses are sent as they are
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6")) # 1 (fastest) to 9 (smallest)
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5")) # 0 (fastest) to 11 (smallest)
@@ -4,11 +4,18 @@ from fastapi.responses import FileResponse  # Used to serve files (eg. index.htm
 
 # Importing routers and database connection functions
 from routes.route import router as router
-from routes.auth import router as auth_router
-from routes.predict import router as predict_router
+from routes.auth import router as auth_router, session_sweeper
+from routes.health import router as health_router
+from routes.analytics import router as analytics_router
+from services.executor import ExecutorSaturated
+from services.passwords import password_executor
+from services.compression import CompressionMiddleware
 from config.db import open_connection, close_connection
+from config.settings import ENABLE_INFERENCE, PRELOAD_MODEL, PRELOAD_RETRY_INTERVAL, SESSION_SWEEP_INTERVAL
 
 from contextlib import asynccontextmanager # Manage application lifecycle
+import asyncio
+import logging
 import os # Used to handle file paths
 
 # Importing the slowapi rate limiter
@@ -17,21 +24,60 @@ from slowapi.middleware import SlowAPIMiddleware
 from slowapi.errors import RateLimitExceeded
 from fastapi.responses import JSONResponse
 
+logger = logging.getLogger("app")
+
+# The inference subsystem (model trial routes) imports torch, which takes seconds and hundreds of MB per worker
+# It is only imported when ENABLE_INFERENCE is on, so dashboard-only replicas start fast with a small footprint
+if ENABLE_INFERENCE:
+    from routes.predict import router as predict_router
+    from services.batcher import inference_batcher, inference_executor
+
+# Load the model and warm it up in the background, retrying until it succeeds (eg. no model uploaded yet)
+# /readyz reports the model as not ready until this is done
+async def preload_model():
+    while True:
+        try:
+            await inference_batcher.warm_up()
+            return
+        except Exception as e:
+            logger.warning(f"Model preload failed, retrying in {PRELOAD_RETRY_INTERVAL} seconds: {e}")
+            await asyncio.sleep(PRELOAD_RETRY_INTERVAL)
+
 # Database connection context manager
+# It also starts the model preload, so the first prediction after a deploy does not pay for it,
+# and the expired session sweeper when it is enabled
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await open_connection()
+    background_tasks = []
+    if ENABLE_INFERENCE and PRELOAD_MODEL:
+        background_tasks.append(asyncio.create_task(preload_model()))
+    if SESSION_SWEEP_INTERVAL > 0:
+        background_tasks.append(asyncio.create_task(session_sweeper(SESSION_SWEEP_INTERVAL)))
     yield
+    for task in background_tasks:
+        task.cancel()
+    if ENABLE_INFERENCE:
+        await inference_batcher.close()
+        inference_executor.shutdown()
+    password_executor.shutdown()
     await close_connection()
     
 # Create a FastAPI instance with a lifespan context manager
 # This context manager opens and closes the database connection when the app starts and stops
 app = FastAPI(lifespan=lifespan)
 
+# Checks reported by /readyz next to the database (the model only counts when it is preloaded)
+app.state.readiness_checks = {"model": lambda: inference_batcher.ready} if ENABLE_INFERENCE and PRELOAD_MODEL else {}
+
 # Rate limiting middleware
 app.state.limiter = limiter
 app.add_middleware(SlowAPIMiddleware)
 
+# Response compression (gzip, or br when the brotli package is installed) from COMPRESSION_MINIMUM_SIZE bytes
+# Added last so it is the outermost middleware and also compresses the error responses
+app.add_middleware(CompressionMiddleware)
+
 # This error handler is triggered when the rate limit is exceeded
 @app.exception_handler(RateLimitExceeded)
 async def rate_limit_exceeded_handler(request, exc):
@@ -39,12 +85,29 @@ async def rate_limit_exceeded_handler(request, exc):
         status_code=429,
         content={"detail": "Rate limit exceeded. Please try again later."},
     )
+
+# This error handler is triggered when a worker pool (eg. inference) has too many requests queued
+@app.exception_handler(ExecutorSaturated)
+async def executor_saturated_handler(request, exc):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy. Please try again later."},
+        headers={"Retry-After": "1"},
+    )
     
 # Include the routers for different routes
 # The routers are defined in separate modules for better organization
+app.include_router(health_router)
 app.include_router(router, prefix="/api")
 app.include_router(auth_router, prefix="/api/auth")
-app.include_router(predict_router, prefix="/api/modeltrial")
+app.include_router(analytics_router, prefix="/api/analytics")
+if ENABLE_INFERENCE:
+    app.include_router(predict_router, prefix="/api/modeltrial")
+else:
+    # Tell clients the model trial is not served here instead of falling through to the frontend route
+    @app.api_route("/api/modeltrial/{path:path}", methods=["GET", "POST"])
+    async def inference_disabled(path: str):
+        return JSONResponse(status_code=503, content={"detail": "Model trial is not available on this server."})
 
 # Serve static files from the 'assets' directory built by using 'npm run build'
 # Assets include CSS and JavaScript files
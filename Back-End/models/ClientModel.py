@@ -0,0 +1,40 @@
+import torch.nn as nn
+
+# Define the model architecture (same from notebook)
+class ClientModel(nn.Module):
+    def __init__(self, num_classes=4):
+        super(ClientModel, self).__init__()
+        
+        # Feature extraction layers
+        self.features = nn.Sequential(
+            # First Block
+            nn.Conv2d(3, 32, kernel_size=3, padding=1),
+            nn.ReLU(),
+            nn.MaxPool2d(kernel_size=2, stride=2),  # 224 -> 112
+            
+            # Second Block
+            nn.Conv2d(32, 64, kernel_size=3, padding=1),
+            nn.ReLU(),
+            nn.MaxPool2d(kernel_size=2, stride=2),  # 112 -> 56
+            
+            # Third Block
+            nn.Conv2d(64, 128, kernel_size=3, padding=1),
+            nn.ReLU(),
+            nn.MaxPool2d(kernel_size=2, stride=2),  # 56 -> 28
+        )
+        
+        # Classifier layers
+        # For input size 224x224, after 3 MaxPool2d: 28x28
+        # Final feature map size: 128 x 28 x 28 = 100352
+        self.classifier = nn.Sequential(
+            nn.Linear(128 * 28 * 28, 128),  # Adjust flattened size
+            nn.ReLU(),
+            nn.Dropout(0.5),  # Dropout to prevent overfitting
+            nn.Linear(128, num_classes)
+        )
+
+    def forward(self, x):
+        x = self.features(x)
+        x = x.view(x.size(0), -1)  # Flatten the tensor, size(0) keeps the batch dim
+        x = self.classifier(x)
+        return x
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field, model_validator # Use pydantic for data validation
+from pydantic import BaseModel, Field, field_validator, model_validator # Use pydantic for data validation
 from datetime import datetime, timezone, timedelta 
 
 # This class is used to represent the metrics of a training round.
@@ -23,12 +23,23 @@ class TrainingRound(BaseModel):
         arbitrary_types_allowed = True 
         extra = 'allow' 
     
+    # The round is stored as a string but also as a number (round_number) to sort and upsert the rounds
+    # so it has to be a whole number written the usual way, eg. "12" (not "012", "+12", " 12" or "1_2", which would
+    # silently share the round_number of another round)
+    @field_validator('round')
+    def check_round_number(cls, value):
+        if not (value.isascii() and value.isdigit() and str(int(value)) == value):
+            raise ValueError(f"Round must be a whole number, got {value!r}")
+        return value
+
     # This method is used to validate the fields of the TrainingRound class.
     # It checks if the field names start with 'client_' or are in the allowed fields list.
     @model_validator(mode='before')
     def check_client_fields(cls, values):
         allowed_fields = ['round', 'Global', 'created_at', '_id']
-        
+        if not isinstance(values, dict):
+            return values # Not an object (eg. null or a list), pydantic rejects it with a validation error
+
         for field in values:
             if not (field.startswith("client_") or field in allowed_fields):
                 raise ValueError(f"Invalid field name: {field}. Field names must start with 'client_'")
@@ -1,5 +1,51 @@
+import functools
+from collections import defaultdict
+
 from slowapi import Limiter
+from slowapi.errors import RateLimitExceeded
 from slowapi.util import get_remote_address
 
+from config.settings import RATE_LIMIT_STORAGE_URI, RATE_LIMIT_STRATEGY
+import services.rate_limit_storage # Registers the sqlite:// storage
+
+# Limiter that counts the allowed and rejected requests of each rate limited route (in this worker)
+class CountingLimiter(Limiter):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.route_counters = defaultdict(lambda: {"allowed": 0, "rejected": 0})
+
+    # Same as Limiter.limit, and counts the requests of the decorated route that passed or hit the limit
+    # Only the public decorator is wrapped, so the counting does not depend on slowapi internals (the limited routes are all async)
+    def limit(self, *args, **kwargs):
+        limit_decorator = super().limit(*args, **kwargs)
+
+        def decorator(func):
+            limited = limit_decorator(func)
+
+            @functools.wraps(limited)
+            async def wrapper(*func_args, **func_kwargs):
+                rejected = False
+                try:
+                    return await limited(*func_args, **func_kwargs)
+                except RateLimitExceeded:
+                    rejected = True
+                    raise
+                finally:
+                    self._count(func_kwargs.get("request"), rejected)
+            return wrapper
+        return decorator
+
+    def _count(self, request, rejected: bool):
+        if request is not None:
+            self.route_counters[request.scope["path"]]["rejected" if rejected else "allowed"] += 1
+
+    def stats(self) -> dict:
+        return {
+            "storage": RATE_LIMIT_STORAGE_URI.split("://", 1)[0],
+            "strategy": RATE_LIMIT_STRATEGY,
+            "routes": {route: dict(counters) for route, counters in self.route_counters.items()},
+        }
+
 # Initialize the rate limiter outside of main.py because of circular import issues
-limiter = Limiter(key_func=get_remote_address)
\ No newline at end of file
+# The counters are kept in RATE_LIMIT_STORAGE_URI so they can be shared by every worker and survive restarts
+limiter = CountingLimiter(key_func=get_remote_address, storage_uri=RATE_LIMIT_STORAGE_URI, strategy=RATE_LIMIT_STRATEGY)
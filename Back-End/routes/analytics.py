@@ -0,0 +1,115 @@
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request
+from fastapi.responses import JSONResponse
+import numpy as np
+from services.round_store import round_store, rolling_mean, rank_descending, best_k, METRICS # Columnar copy of the rounds
+from services.http_cache import check_not_modified # ETags of the store version
+from routes.auth import get_current_active_user  # Import the dependency for authentication
+
+router = APIRouter() # Analytics computed on the in-memory round store, included with the prefix /api/analytics
+# The responses carry an ETag of the store version, a client that already has it gets a 304 before anything is computed
+
+# Index of a metric on the metric axis of the store
+def metric_axis(metric: str) -> int:
+    if metric not in METRICS:
+        raise HTTPException(status_code=400, detail=f"Unknown metric {metric}, expected one of {', '.join(METRICS)}")
+    return METRICS.index(metric)
+
+# Column of a client in the store
+def client_axis(store, client_id: str) -> int:
+    if client_id not in store.client_index:
+        raise HTTPException(status_code=404, detail=f"Client {client_id} not found")
+    return store.column(client_id)
+
+# Row of a round in the store, the last round when none is given
+def round_axis(store, round_number: int | None) -> int:
+    if not store.count:
+        raise HTTPException(status_code=404, detail="No rounds have been posted yet")
+    row = store.count - 1 if round_number is None else store.row(round_number)
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"Round {round_number} not found")
+    return row
+
+# JSON value of a float, NaN (no value) becomes null
+def json_value(value: float):
+    return None if np.isnan(value) else float(value)
+
+# This endpoint returns the rolling mean of a metric of one client over the last window rounds, for every round
+@router.get("/rolling", response_model=dict)
+async def get_rolling_mean(request: Request, client: str = "Global", metric: str = "f1", window: int = Query(10, ge=1), current_user = Depends(get_current_active_user)):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions to access this resource")
+    store = await round_store.get()
+    validators = check_not_modified(request, f"rounds-{store.version}")
+    values = store.values[:, client_axis(store, client), metric_axis(metric)]
+    return JSONResponse(headers=validators, content={
+        "client_id": client,
+        "metric": metric,
+        "window": window,
+        "rounds": store.round_numbers.tolist(),
+        "values": [json_value(value) for value in rolling_mean(values, window)],
+    })
+
+# This endpoint ranks the clients (not Global) by a metric in one round, the last round when none is given
+@router.get("/rank", response_model=dict)
+async def get_client_rank(request: Request, metric: str = "f1", round: int | None = None, current_user = Depends(get_current_active_user)):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions to access this resource")
+    store = await round_store.get()
+    validators = check_not_modified(request, f"rounds-{store.version}")
+    row = round_axis(store, round)
+    columns = np.array([column for client_id, column in store.client_index.items() if client_id != "Global"], dtype=np.int64)
+    values = store.values[row, columns, metric_axis(metric)]
+    ranks = rank_descending(values)
+    order = np.lexsort((ranks, ranks == 0)) # By rank, clients without a value last
+    return JSONResponse(headers=validators, content={
+        "round": int(store.round_numbers[row]),
+        "metric": metric,
+        "ranking": [
+            {"client_id": store.client_ids[columns[position]], "value": json_value(values[position]), "rank": int(ranks[position]) or None}
+            for position in order
+        ],
+    })
+
+# This endpoint returns the k rounds with the highest value of a metric for one client, best first
+@router.get("/best", response_model=dict)
+async def get_best_rounds(request: Request, client: str = "Global", metric: str = "f1", k: int = Query(5, ge=1, le=1000), current_user = Depends(get_current_active_user)):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions to access this resource")
+    store = await round_store.get()
+    validators = check_not_modified(request, f"rounds-{store.version}")
+    values = store.values[:, client_axis(store, client), metric_axis(metric)]
+    rows = best_k(values, k)
+    return JSONResponse(headers=validators, content={
+        "client_id": client,
+        "metric": metric,
+        "rounds": [{"round": int(store.round_numbers[row]), "value": float(values[row])} for row in rows],
+    })
+
+# This endpoint returns, for every client and Global, the change of a metric between a round and the round before it
+@router.get("/deltas", response_model=dict)
+async def get_round_deltas(request: Request, metric: str = "f1", round: int | None = None, current_user = Depends(get_current_active_user)):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions to access this resource")
+    store = await round_store.get()
+    validators = check_not_modified(request, f"rounds-{store.version}")
+    row = round_axis(store, round)
+    axis = metric_axis(metric)
+    current = store.values[row, :, axis]
+    previous = store.values[row - 1, :, axis] if row > 0 else np.full(len(store.client_ids), np.nan)
+    deltas = current - previous
+    return JSONResponse(headers=validators, content={
+        "round": int(store.round_numbers[row]),
+        "previous_round": int(store.round_numbers[row - 1]) if row > 0 else None,
+        "metric": metric,
+        "deltas": {
+            client_id: {"value": json_value(current[column]), "delta": json_value(deltas[column])}
+            for client_id, column in store.client_index.items()
+        },
+    })
+
+# This endpoint shows the size of the round store and how often it was reloaded or updated
+@router.get("/store", response_model=dict)
+async def get_store_stats(current_user = Depends(get_current_active_user)):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions to access this resource")
+    return (await round_store.get()).stats()
@@ -1,10 +1,13 @@
-from fastapi import Depends, HTTPException, Response, Request, APIRouter, Form 
+from fastapi import Depends, HTTPException, Response, Request, APIRouter, Form, BackgroundTasks
 from pydantic import EmailStr
-from passlib.context import CryptContext # Password hashing library
 from datetime import datetime, timedelta, timezone
 import secrets # For generating secure tokens
+import asyncio
 import logging
 from config.db import mongodb # MongoDB connection
+from config.settings import SESSION_CACHE_MAX_ENTRIES, SESSION_CACHE_TTL
+from services.lru_cache import LRUCache # In-process cache of validated sessions
+from services.passwords import hash_password, verify_password, needs_rehash # Argon2 hashing off the event loop
 from rateLimiter import limiter # Rate limiter
 
 router = APIRouter() # Groups all routes in this file into a single router with a prefix /api/auth
@@ -44,10 +47,6 @@ class PasswordStr(str):
             raise HTTPException( status_code=400, detail="Password must contain at least one letter")
         return value
     
-# Password Hashing
-# Recommended by OWASP and defaults to argon2id
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
-
 # Generate secure session token
 # It looks like this: 49bf7be3593ce9da969d87adf9f8d4a9946405ba08c1fb498a0af39fda602245
 def generate_session_token():
@@ -65,19 +64,33 @@ async def create_session(user_id: str):
     return session_token
 
 # Get session from MongoDB by token
+# Expired sessions are filtered out by the query, they are removed by the TTL index on expires (or the sweeper below)
+# so reading a session never has to write
 async def get_session(token: str):
     sessions_collection = get_sessions_collection()
-    session = await sessions_collection.find_one({"token": token})
-    if session:
-        expiry_time = session["expires"]
-        expiry_time = expiry_time.replace(tzinfo=timezone.utc)
-        if expiry_time < datetime.now(timezone.utc): # Check if session is expired
-            await sessions_collection.delete_one({"token": token}) # Remove expired session
-            logger.info(f"Session with token {token} has expired and was removed.")
-            return None  # Session expired
-
-        return session # Session is valid
-    return None
+    return await sessions_collection.find_one({"token": token, "expires": {"$gt": datetime.now(timezone.utc)}})
+
+# Remove every expired session
+async def sweep_expired_sessions():
+    sessions_collection = get_sessions_collection()
+    result = await sessions_collection.delete_many({"expires": {"$lte": datetime.now(timezone.utc)}})
+    if result.deleted_count:
+        logger.info(f"Removed {result.deleted_count} expired sessions.")
+
+# Background task that removes expired sessions every interval seconds
+# Only needed where the TTL index on Sessions.expires is not available (started from main.py)
+async def session_sweeper(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await sweep_expired_sessions()
+        except Exception as e:
+            logger.warning(f"Session sweep failed: {e}")
+
+# Cache of validated sessions (token -> user) so authenticated requests do not query MongoDB every time
+# Entries are kept until the session expires or for SESSION_CACHE_TTL seconds, whichever comes first,
+# and are removed on logout and when the user logs in again
+session_cache = LRUCache(SESSION_CACHE_MAX_ENTRIES, SESSION_CACHE_TTL)
 
 # Authentication Middleware
 async def get_current_user(request: Request):
@@ -86,6 +99,10 @@ async def get_current_user(request: Request):
     if not token: # If no token is found, raise an exception
         raise HTTPException(status_code=401, detail="Unauthorized")
 
+    user = session_cache.get(token) # Session validated recently, no database reads needed
+    if user is not None:
+        return user
+
     session = await get_session(token) # Get session from MongoDB
     if not session: # If session is not found or expired, raise an exception
         raise HTTPException(status_code=401, detail="Session expired or invalid")
@@ -93,7 +110,9 @@ async def get_current_user(request: Request):
     user = await users_collection.find_one({"_id": session["user_id"]}) # Get user from MongoDB using session user_id
     if not user: # If user is not found, raise an exception (this happens if the user was deleted)
         raise HTTPException(status_code=401, detail="User not found.")
-    
+
+    expiry_time = session["expires"].replace(tzinfo=timezone.utc)
+    session_cache.put(token, user, expires_at=expiry_time.timestamp()) # Never cached past the session expiry
     return user
 
 # Get current active user (for protected routes and api calls)
@@ -116,7 +135,7 @@ async def register_user(request: Request, username: EmailStr = Form(...), passwo
         raise HTTPException(status_code=400, detail="Email already registered")
 
     # Hash the password and store the user in MongoDB
-    hashed_password = pwd_context.hash(password)
+    hashed_password = await hash_password(password)
     user = {
         "username": username,
         "password": hashed_password,
@@ -127,25 +146,41 @@ async def register_user(request: Request, username: EmailStr = Form(...), passwo
     logger.info(f"User registered successfully: {username}")
     return {"message": "User registered successfully"}
 
+# Store a new hash of the password made with the current Argon2 parameters
+# The update only applies if the hash was not changed in the meantime (eg. by another login)
+async def rehash_password(user_id, password: str, old_hash: str):
+    users_collection = get_users_collection()
+    try:
+        new_hash = await hash_password(password)
+        await users_collection.update_one({"_id": user_id, "password": old_hash}, {"$set": {"password": new_hash}})
+        logger.info(f"Password hash of user with ID {user_id} updated to the current parameters.")
+    except Exception as e:
+        logger.warning(f"Could not rehash the password of user with ID {user_id}: {e}")
+
 # Login & Create Session
 @router.post("/login")
 @limiter.limit("20/minute")
-async def login(request: Request, response: Response, username: str = Form(...), password: str = Form(...)):
+async def login(request: Request, response: Response, background_tasks: BackgroundTasks, username: str = Form(...), password: str = Form(...)):
     users_collection = get_users_collection()
     sessions_collection = get_sessions_collection()
     
     # Check if user exists
     user = await users_collection.find_one({"username": username})
-    if not user or not pwd_context.verify(password, user["password"]):
+    if not user or not await verify_password(password, user["password"]):
         logger.warning(f"Failed login attempt for username: {username}")
         raise HTTPException(status_code=401, detail="Invalid credentials")
     logger.info(f"User {username} logged in successfully")
+
+    # Rehash the password if the Argon2 parameters changed, after the response is sent so login is not slowed down
+    if needs_rehash(user["password"]):
+        background_tasks.add_task(rehash_password, user["_id"], password, user["password"])
     
     # Return the role of the user
     role = user.get("role")
     
     # Remove the previous session of the user if it exists
     await sessions_collection.delete_many({"user_id": user["_id"]})
+    session_cache.pop_where(lambda cached_user: cached_user["_id"] == user["_id"])
     # Create a new session for the user
     session_token = await create_session(user["_id"])
     
@@ -171,6 +206,7 @@ async def logout(response: Response, request: Request):
         session = await sessions_collection.find_one({"token": token})
         logger.info(f"User with ID {session['user_id']} logged out successfully.")
         await sessions_collection.delete_one({"token": token})
+        session_cache.pop(token)
 
     # Remove the session token cookie from the response
     # This will delete the cookie from the client side
@@ -183,6 +219,13 @@ async def logout(response: Response, request: Request):
 async def verify_token(request: Request, user=Depends(get_current_user)):
     return {"message": "Session is valid.", "username": user["username"],"role": user["role"]}
 
+# Rate limiter storage, strategy and the allowed/rejected requests per route (counted by this worker)
+@router.get("/rate-limits", dependencies=[Depends(get_current_active_user)])
+async def read_rate_limits(current_user = Depends(get_current_user)):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    return limiter.stats()
+
 # Protected Routes
 # Only accessible to authenticated users with the correct role
 @router.get("/dashboard", dependencies=[Depends(get_current_active_user)])
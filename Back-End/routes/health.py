@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+from config.db import mongodb # MongoDB connection
+import logging
+
+router = APIRouter() # Groups the health check routes, included without a prefix
+
+logger = logging.getLogger("app")
+
+# Liveness probe, the process is up and serving requests
+@router.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+# Readiness probe, only ready once the database answers and every registered check passes
+# Other checks are registered in main.py as app.state.readiness_checks (name -> function returning True when ready),
+# eg. the model being loaded and warmed up
+@router.get("/readyz")
+async def readyz(request: Request):
+    checks = {}
+    try:
+        await mongodb.db.command("ping")
+        checks["database"] = True
+    except Exception as e:
+        logger.warning(f"Readiness check failed for the database: {e}")
+        checks["database"] = False
+
+    for name, check in getattr(request.app.state, "readiness_checks", {}).items():
+        checks[name] = bool(check())
+
+    ready = all(checks.values())
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "not ready", "checks": checks},
+    )
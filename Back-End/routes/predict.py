@@ -1,117 +1,176 @@
-from fastapi import APIRouter, File, UploadFile, Request 
-# Necessary imports for model architecture and image processing
-import torch
-import torch.nn as nn
-import torch.nn.functional as F
-import torchvision.transforms as transforms
-
-from PIL import Image # Pillow library for image processing
-from config.db import mongodb
-import io
-from motor.motor_asyncio import AsyncIOMotorGridFSBucket  # async GridFS
+from fastapi import APIRouter, File, UploadFile, Request, Response, HTTPException, Header, Depends, status
+from fastapi.responses import StreamingResponse # Used to stream batch results line by line
+from starlette.datastructures import UploadFile as StarletteUploadFile # Type of the files in a parsed form
+import torch # Used to stack images into batches
+
+import os
+import json
+import asyncio
+import tarfile
+import zipfile
+from bson import ObjectId # GridFS file ids are ObjectIds
+from models.ClientModel import ClientModel # Model architecture (kept importable from here)
+from services.model_registry import model_registry # In-memory cache of the latest model
+from services.batcher import inference_batcher, inference_executor, predict_probabilities # Batches predictions and runs them off the event loop
+from services.uploads import iter_upload_images, UploadError # Reads images from uploaded files and archives
+from services.preprocessing import preprocess_image, ImageTooLarge # Fast decode and normalization of images
+from services.prediction_cache import prediction_cache, content_hash # Results of images that were already predicted
+from config.settings import BATCH_MAX_SIZE, BATCH_UPLOAD_MAX_FILES, MAX_IMAGE_BYTES
+from routes.auth import get_current_active_user # Dependency for authentication
 from rateLimiter import limiter 
 
 router = APIRouter() # Groups all routes in this file into a single router with a prefix /api/predict
 
-# Dynamically create the GridFS bucket
-def get_gridfs_bucket():
-    if mongodb.db is None:  # Explicitly check if the database is None
-        raise RuntimeError("Database connection has not been initialized.")
-    return AsyncIOMotorGridFSBucket(mongodb.db)
-
-# Define the model architecture (same from notebook)
-class ClientModel(nn.Module):
-    def __init__(self, num_classes=4):
-        super(ClientModel, self).__init__()
-        
-        # Feature extraction layers
-        self.features = nn.Sequential(
-            # First Block
-            nn.Conv2d(3, 32, kernel_size=3, padding=1),
-            nn.ReLU(),
-            nn.MaxPool2d(kernel_size=2, stride=2),  # 224 -> 112
-            
-            # Second Block
-            nn.Conv2d(32, 64, kernel_size=3, padding=1),
-            nn.ReLU(),
-            nn.MaxPool2d(kernel_size=2, stride=2),  # 112 -> 56
-            
-            # Third Block
-            nn.Conv2d(64, 128, kernel_size=3, padding=1),
-            nn.ReLU(),
-            nn.MaxPool2d(kernel_size=2, stride=2),  # 56 -> 28
-        )
-        
-        # Classifier layers
-        # For input size 224x224, after 3 MaxPool2d: 28x28
-        # Final feature map size: 128 x 28 x 28 = 100352
-        self.classifier = nn.Sequential(
-            nn.Linear(128 * 28 * 28, 128),  # Adjust flattened size
-            nn.ReLU(),
-            nn.Dropout(0.5),  # Dropout to prevent overfitting
-            nn.Linear(128, num_classes)
-        )
+# Cached predictions belong to one model version, so drop them all when a new model is loaded
+model_registry.add_listener(lambda loaded: prediction_cache.clear())
 
-    def forward(self, x):
-        x = self.features(x)
-        x = x.view(x.size(0), -1)  # Flatten the tensor, size(0) keeps the batch dim
-        x = self.classifier(x)
-        return x
-
-# Transformations to prepare input into the neural network
-transform = transforms.Compose([
-    transforms.Resize((224, 224)),
-    transforms.ToTensor(),
-    transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
-])
-
-# Load the latest model from mongoDB GridFS
-async def load_model_from_gridfs(model_name: str):
-    fs = get_gridfs_bucket()
-    model_metadata = await mongodb.db.models.find_one({"model_name": model_name}, sort=[("_id", -1)]) # Get the latest model
-    if not model_metadata:
-        raise ValueError("Model not found in database.")
-
-    file_id = model_metadata["file_id"]
-    file_metadata = await mongodb.db.fs.files.find_one({"_id": file_id})
-    # Retrieve the uploadDate from fs.files metadata
-    upload_date = file_metadata["uploadDate"]
-    
-    # Open the GridFS download stream
-    grid_out = await fs.open_download_stream(file_id)
-    model_bytes = await grid_out.read()
-
-    # Load the model from bytes
-    model = ClientModel()
-    model.load_state_dict(torch.load(io.BytesIO(model_bytes), map_location=torch.device("cpu")))
-    model.eval()
-    return model, upload_date
+# Build the prediction response from one row of probabilities
+def format_prediction(probabilities: list[float], upload_date) -> dict:
+    predicted_class = max(range(len(probabilities)), key=probabilities.__getitem__) # Argmax to get predicted class
+    return {
+        "prediction": f"class_{predicted_class}",
+        "confidence": round(probabilities[predicted_class], 4), # Confidence score
+        "probabilities": {f"class_{i}": round(prob, 4) for i, prob in enumerate(probabilities)},
+        "model_upload_date": str(upload_date),
+    }
 
 # Define the prediction endpoint
 # This endpoint accepts an image file, processes it, and returns the prediction results
+# Results are cached by the hash of the uploaded bytes and the model version, so re-uploading an image skips inference
+# The X-Prediction-Cache header tells whether the result came from the cache (HIT) or not (MISS)
+# The forward pass is shared with other concurrent requests through the inference batcher
+# Decoding and inference run on the inference executor, when it is saturated the request gets a 503
 @router.post("/predict")
 @limiter.limit("10/minute")
-async def predict(request: Request, file: UploadFile = File(...)):
-    image = Image.open(io.BytesIO(await file.read())).convert("RGB") # Read the image 
-    image_size = image.size  # Size of the image (width, height)
+async def predict(request: Request, response: Response, file: UploadFile = File(...)):
     image_format = file.filename.split('.')[-1].upper()  # Image format (e.g., JPEG, PNG)
-    image = transform(image).unsqueeze(0) # Transform and add batch dimension
+    if file.size is not None and file.size > MAX_IMAGE_BYTES: # Reject before reading the upload
+        raise HTTPException(status_code=413, detail=f"Image is larger than {MAX_IMAGE_BYTES} bytes")
+
+    data = await file.read()
+    digest = await asyncio.to_thread(content_hash, data) # Hashing large uploads would block the event loop
+    current = await model_registry.get() # Cheap, the model is cached in memory
+    result = prediction_cache.get((digest, current.file_id))
+    response.headers["X-Prediction-Cache"] = "HIT" if result is not None else "MISS"
 
-    model, upload_date = await load_model_from_gridfs("my_model") # Load the model from GridFS
+    if result is None:
+        async with inference_executor.slot():
+            try:
+                image, image_size = await inference_executor.run(preprocess_image, data)
+            except ImageTooLarge as e: # Too many pixels, found from the image header
+                raise HTTPException(status_code=413, detail=str(e))
+            probabilities, loaded = await inference_batcher.submit(image)
 
-    with torch.no_grad():
-        output = model(image) # Forward pass through the model
-        probabilities = F.softmax(output, dim=1)  # Convert logits to probabilities
-        predicted_class = torch.argmax(probabilities, dim=1).item() # Argmax to get predicted class
-        confidence_score = probabilities[0, predicted_class].item()  # Confidence score
-        all_probs = probabilities.squeeze(0).tolist()  # Convert tensor to list
+        result = {**format_prediction(probabilities, loaded.upload_date), "image_size": image_size}
+        prediction_cache.put((digest, loaded.file_id), result) # Keyed by the version that actually ran
 
     # Returns the prediction result in a structured format
+    return {**result, "image_format": image_format}
+
+# Run one chunk of decoded images through the model and build an NDJSON line per image
+async def predict_chunk(chunk: list, loaded) -> list[str]:
+    rows = await inference_executor.run(predict_probabilities, loaded.model, torch.stack([image for _, image, _ in chunk]))
+    return [
+        json.dumps({
+            "filename": filename,
+            **format_prediction(probabilities, loaded.upload_date),
+            "image_size": image_size,
+            "image_format": filename.split('.')[-1].upper(),
+        }) + "\n"
+        for (filename, _, image_size), probabilities in zip(chunk, rows)
+    ]
+
+# Decode the uploaded images one at a time and yield one NDJSON line per image
+# Images are run through the model in chunks of BATCH_MAX_SIZE, all with the same model version
+# Images that cannot be read produce an error line instead of stopping the whole batch
+async def stream_batch_predictions(form, uploads: list, loaded):
+    try:
+        images = iter_upload_images(uploads)
+        chunk = []
+        while True:
+            try:
+                # Reading the next archive member is blocking file IO, so it runs on the executor as well
+                item = await inference_executor.run(next, images, None)
+            except (UploadError, zipfile.BadZipFile, tarfile.TarError) as e:
+                yield json.dumps({"error": str(e)}) + "\n"
+                break
+            if item is None:
+                break
+
+            filename, data = item
+            if isinstance(data, UploadError):
+                yield json.dumps({"filename": filename, "error": str(data)}) + "\n"
+                continue
+            try:
+                image, image_size = await inference_executor.run(preprocess_image, data)
+            except ImageTooLarge as e:
+                yield json.dumps({"filename": filename, "error": str(e)}) + "\n"
+                continue
+            except Exception: # Corrupt or unsupported image
+                yield json.dumps({"filename": filename, "error": "Invalid image file"}) + "\n"
+                continue
+
+            chunk.append((filename, image, image_size))
+            if len(chunk) >= BATCH_MAX_SIZE:
+                for line in await predict_chunk(chunk, loaded):
+                    yield line
+                chunk = []
+
+        if chunk:
+            for line in await predict_chunk(chunk, loaded):
+                yield line
+    finally:
+        inference_executor.release()
+        await form.close()
+
+# Define the batch prediction endpoint
+# It accepts many image files (form field "files"), or a single zip/tar archive of images
+# Results are streamed back as NDJSON (one JSON object per line, per image) while the batch is processed
+# The form is parsed here instead of through File(...) parameters so the files stay open while the response streams
+@router.post("/predict/batch")
+@limiter.limit("5/minute")
+async def predict_batch(request: Request):
+    form = await request.form(max_files=BATCH_UPLOAD_MAX_FILES)
+    try:
+        uploads = [value for value in form.getlist("files") if isinstance(value, StarletteUploadFile)]
+        if not uploads:
+            raise HTTPException(status_code=400, detail="No files uploaded")
+
+        inference_executor.acquire() # The whole batch counts as one request, released when the stream ends
+        try:
+            loaded = await model_registry.get() # Get the latest model (cached in memory)
+        except Exception:
+            inference_executor.release()
+            raise
+    except Exception:
+        await form.close()
+        raise
+
+    return StreamingResponse(stream_batch_predictions(form, uploads, loaded), media_type="application/x-ndjson")
+
+# This endpoint returns the model cache counters and the model version being served
+@router.get("/model")
+async def get_model_status(current_user = Depends(get_current_active_user)):
+    if current_user["role"] != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions to access this resource"
+        )
     return {
-        "prediction": f"class_{predicted_class}",
-        "confidence": round(confidence_score, 4),
-        "probabilities": {f"class_{i}": round(prob, 4) for i, prob in enumerate(all_probs)},
-        "model_upload_date": str(upload_date),
-        "image_size": image_size,
-        "image_format": image_format
+        **model_registry.stats(),
+        "batching": inference_batcher.stats(),
+        "executor": inference_executor.stats(),
+        "prediction_cache": prediction_cache.stats(),
     }
+
+# This endpoint is called after a new model is uploaded to GridFS so the next prediction uses it right away
+# The file_id is optional, without it the latest model is looked up in the models collection
+# It needs an API key to authenticate the request
+@router.post("/model/refresh")
+async def refresh_model(file_id: str | None = None, x_api_key: str = Header(...)):
+    if x_api_key != os.getenv("API_KEY"):
+        raise HTTPException(status_code=401, detail="Invalid API key")
+    if file_id and not ObjectId.is_valid(file_id):
+        raise HTTPException(status_code=400, detail="Invalid file_id")
+    model_registry.notify(ObjectId(file_id) if file_id else None)
+    return {"message": "Model refresh scheduled"}
@@ -1,57 +1,179 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Header # APIRouter to group routes, HTTPException to handle exceptions, status for HTTP status codes, Depends for dependency injection
+from fastapi import APIRouter, HTTPException, status, Depends, Header, Request, Query # APIRouter to group routes, HTTPException to handle exceptions, status for HTTP status codes, Depends for dependency injection
 from models.TrainingRound import TrainingRound # Pydantic model for TrainingRound
 from config.db import mongodb # MongoDB connection
+from services.round_ingestion import ingest_rounds, ingest_ndjson, iter_lines, NDJSONError, INGESTION_MODES, CLIENT_METRICS, public_round # Incremental and atomic round ingestion
 from fastapi.encoders import jsonable_encoder # Convert Pydantic models to dictionaries (because of complex types e.g., datetime)
+from fastapi.responses import JSONResponse, StreamingResponse # StreamingResponse writes the export as it is read
+from models.TrainingRound import Metrics # Metric names allowed in fields=
+from config.settings import ROUNDS_PAGE_SIZE, ROUNDS_PAGE_MAX, EXPORT_BATCH_SIZE, CHART_DEFAULT_POINTS, CHART_MAX_POINTS, CHART_MAX_CLIENTS
+from services.downsampling import downsample, DOWNSAMPLING_METHODS # LTTB and min/max downsampling of chart series
+import numpy as np
+import asyncio
+import json
+import re
+import logging
+from services.round_summary import round_summary # Best rounds and client list kept in memory
+from services.http_cache import cached_json_response, rounds_validators # ETag/Last-Modified responses and 304s
+from services.events import event_broadcaster, resync_event, TooManySubscribers # Pushes new rounds to the open dashboards
 from routes.auth import get_current_active_user  # Import the dependency for authentication
 import os
 
+logger = logging.getLogger("app")
+
 router = APIRouter() # Groups all routes in this file into a single router with a prefix /api
 
-# This endpoint retrieves all training rounds from the database
+# Metric names from a fields= parameter (eg. "f1,accuracy"), None when all metrics are wanted
+def parse_fields(fields: str | None) -> list[str] | None:
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in Metrics.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}. Expected some of {', '.join(Metrics.model_fields)}")
+    return names
+
+# Keep only the given metrics of every client (and Global) of a Rounds document
+def project_metrics(round: dict, metric_names: list[str] | None) -> dict:
+    if metric_names:
+        for key, value in round.items():
+            if (key == "Global" or key.startswith("client_")) and isinstance(value, dict):
+                round[key] = {name: value[name] for name in metric_names if name in value}
+    return round
+
+# Page of a listing, the round number to pass as after= for the next page is in the X-Next-Cursor header (absent on the last page)
+def page_response(items: list, next_cursor: int | None, headers: dict = None) -> JSONResponse:
+    headers = dict(headers or {})
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = str(next_cursor)
+    return JSONResponse(content=jsonable_encoder(items), headers=headers)
+
+# Dependency of the admin routes that read the rounds: the role is checked first, so only an admin can get a 304
+async def admin_rounds_validators(request: Request, current_user = Depends(get_current_active_user)) -> dict:
+    if current_user["role"] != "admin":
+        raise HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail="Not enough permissions to access this resource"
+        )
+    return await rounds_validators(request)
+
+# This endpoint retrieves the training rounds from the database, limit rounds at a time in round order
+# Pass the X-Next-Cursor header of a page as after= to get the next one, fields= (eg. f1,accuracy) keeps only those metrics
 # It is mostly used for debugging
 @router.get("/get", response_model=list[TrainingRound])
-async def get_rounds(current_user: str = Depends(get_current_active_user)):
+async def get_rounds(
+    after: int | None = None,
+    limit: int = Query(ROUNDS_PAGE_SIZE, ge=1, le=ROUNDS_PAGE_MAX),
+    fields: str | None = None,
+    validators: dict = Depends(admin_rounds_validators),
+):
     try:
-        # Ensure the user has the correct role or permissions
-        if current_user["role"] != "admin":
-            raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions to access this resource"
-            )
+        metric_names = parse_fields(fields)
         
-        rounds = await mongodb.db['Rounds'].find({}, {"_id": 0}).to_list(None)
-        return rounds
+        # One more round than the limit is read to know if there is a next page
+        query = {"round_number": {"$gt": after}} if after is not None else {}
+        cursor = mongodb.db['Rounds'].find(query, {"_id": 0}).sort("round_number", 1).limit(limit + 1)
+        rounds = await cursor.to_list(limit + 1)
+        next_cursor = rounds[limit - 1]["round_number"] if len(rounds) > limit else None
+
+        page = []
+        for round in rounds[:limit]:
+            round.pop("round_number")
+            page.append(project_metrics(round, metric_names))
+        return page_response(page, next_cursor, validators)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
+# Write the rounds of a cursor as a JSON array or as NDJSON (one round per line), one chunk per batch_size rounds
+# The documents are already JSON friendly (they were stored through jsonable_encoder), so they are not validated again
+async def stream_rounds(cursor, export_format: str, metric_names: list[str] | None, batch_size: int = EXPORT_BATCH_SIZE):
+    separator = "\n" if export_format == "ndjson" else ","
+    if export_format == "json":
+        yield "["
+    first = True
+    chunk = []
+    try:
+        async for round in cursor:
+            chunk.append(json.dumps(project_metrics(round, metric_names), default=str))
+            if len(chunk) >= batch_size:
+                yield ("" if first else separator) + separator.join(chunk)
+                first = False
+                chunk = []
+        if chunk:
+            yield ("" if first else separator) + separator.join(chunk)
+            first = False
+    except Exception as e:
+        # The status code was already sent, the error ends the stream (the JSON array is left unterminated)
+        logger.error(f"Round export failed: {e}")
+        raise
+    if export_format == "ndjson" and not first:
+        yield "\n"
+    if export_format == "json":
+        yield "]"
+
+# This endpoint exports every training round in round order, written as it is read from the database
+# format=json returns a JSON array, format=ndjson one round per line, fields= (eg. f1,accuracy) keeps only those metrics
+# Memory use and time to the first byte do not depend on the number of rounds
+@router.get("/export")
+async def export_rounds(format: str = "json", fields: str | None = None, validators: dict = Depends(admin_rounds_validators)):
+    if format not in ("json", "ndjson"):
+        raise HTTPException(status_code=400, detail="Invalid format, expected json or ndjson")
+    metric_names = parse_fields(fields)
+
+    cursor = mongodb.db['Rounds'].find({}, {"_id": 0, "round_number": 0}).sort("round_number", 1).batch_size(EXPORT_BATCH_SIZE)
+    media_type = "application/x-ndjson" if format == "ndjson" else "application/json"
+    return StreamingResponse(
+        stream_rounds(cursor, format, metric_names),
+        media_type=media_type,
+        headers={**validators, "Content-Disposition": f'attachment; filename="rounds.{format}"'},
+    )
+
 # This endpoint is to post a list of training rounds to the database
-# It drops the existing collection and inserts the new rounds so that the database is always up to date
+# mode=upsert (default) adds the new rounds and updates the changed ones, the other rounds are not touched
+# mode=replace replaces all the rounds at once, the previous rounds stay readable until the new ones are in place
+# Only the rounds that were added or changed are returned
 # It needs an API key to authenticate the request
 @router.post("/post", response_model=list[TrainingRound])
-async def post_round(round: list[TrainingRound], x_api_key: str = Header(...)):
+async def post_round(round: list[TrainingRound], mode: str = "upsert", x_api_key: str = Header(...)):
+    api_key = os.getenv("API_KEY")
+    if x_api_key != api_key:
+        raise HTTPException(status_code=401, detail="Invalid API key")
+    if mode not in INGESTION_MODES:
+        raise HTTPException(status_code=400, detail=f"Invalid mode, expected one of {', '.join(INGESTION_MODES)}")
+    if mode == "replace" and not round:
+        raise HTTPException(status_code=400, detail="A replacement needs at least one round")
+
     try:
-        api_key = os.getenv("API_KEY")
-        if x_api_key != api_key:
-            raise HTTPException(status_code=401, detail="Invalid API key")
-        
-        rounds_dict = jsonable_encoder(round)
-        await mongodb.db['Rounds'].drop() # Drop the existing collection
-        
-        # Insert the rounds data into the database (insert_many for multiple records at once)
-        result = await mongodb.db['Rounds'].insert_many(rounds_dict)
-        
-        # Add the inserted IDs to each round 
-        # This is done to return the IDs of the inserted rounds
-        for i, inserted_id in enumerate(result.inserted_ids):
-            rounds_dict[i]["_id"] = str(inserted_id)
-        return rounds_dict
+        delta = await ingest_rounds(mongodb.db, jsonable_encoder(round), mode)
+
+        # Return the IDs as strings and without the internal round_number
+        return [public_round(document) for document in delta]
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+# This endpoint is the streaming version of /post for large uploads
+# The body is NDJSON (one training round per line), read and validated line by line and upserted in batches,
+# so the whole upload is never held in memory. Invalid lines are skipped and reported in the summary
+# It needs an API key to authenticate the request
+@router.post("/post/stream")
+async def post_round_stream(request: Request, x_api_key: str = Header(...)):
+    api_key = os.getenv("API_KEY")
+    if x_api_key != api_key:
+        raise HTTPException(status_code=401, detail="Invalid API key")
+
+    try:
+        return await ingest_ndjson(mongodb.db, iter_lines(request.stream()))
+    except NDJSONError as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 # This endpoint retrieves all unique client IDs from the database
-# It dynamically fetches the client field names from the first document in the collection
+# Global comes first, then the clients in numeric order (client_2 before client_10)
+# It is served from the in-memory round summary, with an ETag so polling clients get a 304 until new rounds are posted
 @router.get("/client", response_model=list[str])
-async def get_unique_client_ids(current_user: str = Depends(get_current_active_user)):
+async def get_unique_client_ids(request: Request, current_user: str = Depends(get_current_active_user)):
     try:
         # Ensure the user has the correct role or permissions
         if current_user["role"] != "admin":
@@ -60,55 +182,42 @@ async def get_unique_client_ids(current_user: str = Depends(get_current_active_u
             detail="Not enough permissions to access this resource"
             )
             
-        # Fetch a single document from the collection
-        first_doc = await mongodb.db['Rounds'].find_one()
-
-        # Get the client field names and Global dynamically 
-        client_fields = [key for key in first_doc.keys() if key.startswith('client_') or key.startswith('Global')]
-        
-        return client_fields
+        summary = await round_summary.get()
+        return cached_json_response(request, summary.client_ids(), summary.version_tag, summary.updated_at)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
-# This endpoint retrieves all rounds for a specific client ID
+# This endpoint retrieves the rounds of a specific client ID, limit rounds at a time
 # It allows sorting the results in ascending or descending order based on the round number
 # Descending order for the tables and ascending order for the charts
+# Pass the X-Next-Cursor header of a page as after= to get the next one, fields= (eg. f1,accuracy) keeps only those metrics
 @router.get("/rounds/{client_id}", response_model=list[dict])
-async def get_client_rounds(client_id: str, order: str = "desc", current_user: str = Depends(get_current_active_user)):
+async def get_client_rounds(
+    client_id: str,
+    order: str = "desc",
+    after: int | None = None,
+    limit: int = Query(ROUNDS_PAGE_SIZE, ge=1, le=ROUNDS_PAGE_MAX),
+    fields: str | None = None,
+    validators: dict = Depends(admin_rounds_validators),
+):
     try:
-        # Ensure the user has the correct role or permissions
-        if current_user["role"] != "admin":
-            raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions to access this resource"
-            )
+        metric_names = parse_fields(fields)
             
         # Determine the sort order based on the query parameter
         sort_order = -1 if order == "desc" else 1
 
-        # Aggregate pipeline to retrieve all rounds of a specific client
-        pipeline = [
-            # Match documents where the client_id field matches the provided client_id
-            {"$match": {f"{client_id}": {"$exists": True}}}, # Match documents with the client_id field
-            {
-                "$addFields": {
-                    "round_as_number": {"$toInt": "$round"}  # Convert the round field to an integer
-                }
-            },
-            {
-                "$project": { 
-                    "_id": 0,  # Exclude the MongoDB _id field
-                    "round": "$round",  # the round field is a string
-                    "created_at": "$created_at",  
-                    "metrics": f"${client_id}",
-                    "round_as_number": 1  # Include the converted round_as_number field for sorting
-                }
-             },
-             {"$sort": {"round_as_number": sort_order}},  # Sort by round number in the specified order
-        ]
-
-        # Execute the aggregation pipeline
-        rounds = await mongodb.db['Rounds'].aggregate(pipeline).to_list(None)
+        # One document per round of this client, read in order from the (client_id, round_number) index
+        # The page starts after the cursor in the requested order, and only the requested metrics are read
+        query = {"client_id": client_id}
+        if after is not None:
+            query["round_number"] = {"$lt" if sort_order == -1 else "$gt": after}
+        projection = {"_id": 0, "round": 1, "round_number": 1, "created_at": 1}
+        projection.update({f"metrics.{name}": 1 for name in metric_names} if metric_names else {"metrics": 1})
+        cursor = mongodb.db[CLIENT_METRICS].find(query, projection).sort("round_number", sort_order).limit(limit + 1)
+        rounds = await cursor.to_list(limit + 1)
+        next_cursor = rounds[limit - 1]["round_number"] if len(rounds) > limit else None
 
         # Simplify the response format
         simplified_rounds = [
@@ -117,17 +226,123 @@ async def get_client_rounds(client_id: str, order: str = "desc", current_user: s
                 "metrics": round.get("metrics"),  
                 "created_at": round.get("created_at"),
             }
-            for round in rounds
+            for round in rounds[:limit]
         ]
-        return simplified_rounds
+        return page_response(simplified_rounds, next_cursor, validators)
     
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+# Client IDs from a clients= parameter (eg. "Global,client_1")
+# They are used as field names in projections, so only Global and client_<letters, digits or _> are accepted
+def parse_clients(clients: str) -> list[str]:
+    client_ids = list(dict.fromkeys(client_id.strip() for client_id in clients.split(",") if client_id.strip()))
+    if not client_ids:
+        raise HTTPException(status_code=400, detail="At least one client is needed")
+    invalid = [client_id for client_id in client_ids if client_id != "Global" and not re.fullmatch(r"client_\w+", client_id)]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid client IDs: {', '.join(invalid)}")
+    if len(client_ids) > CHART_MAX_CLIENTS:
+        raise HTTPException(status_code=400, detail=f"At most {CHART_MAX_CLIENTS} clients can be requested at once")
+    return client_ids
+
+# Round numbers and one array per metric (NaN where a round has no value) of a client, in round order
+async def client_series(client_id: str, metric_names: list[str]) -> tuple[np.ndarray, dict]:
+    projection = {"_id": 0, "round_number": 1, **{f"metrics.{name}": 1 for name in metric_names}}
+    rounds, values = [], {name: [] for name in metric_names}
+    async for document in mongodb.db[CLIENT_METRICS].find({"client_id": client_id}, projection).sort("round_number", 1):
+        rounds.append(document["round_number"])
+        metrics = document.get("metrics") or {}
+        for name in metric_names:
+            values[name].append(metrics.get(name, np.nan))
+    return np.array(rounds, dtype=np.int64), {name: np.array(column, dtype=np.float64) for name, column in values.items()}
+
+# Downsample every metric of every client, returns {client_id: {metric: {"rounds": [...], "values": [...]}}}
+def downsample_series(series: dict, points: int, method: str) -> dict:
+    result = {}
+    for client_id, (rounds, columns) in series.items():
+        result[client_id] = {}
+        for name, values in columns.items():
+            present = ~np.isnan(values)
+            kept = downsample(rounds[present], values[present], points, method)
+            result[client_id][name] = {"rounds": rounds[present][kept].tolist(), "values": values[present][kept].tolist()}
+    return result
+
+# This endpoint returns chart data: the selected metrics of Global and the chosen clients, each downsampled to at most points points
+# method=lttb (default) keeps the shape of the lines, method=minmax keeps the lowest and highest value of each bucket of rounds
+# The payload size only depends on points, not on the number of rounds
+@router.get("/chart", response_model=dict)
+async def get_chart_data(
+    clients: str = "Global",
+    metrics: str = "f1",
+    points: int = Query(CHART_DEFAULT_POINTS, ge=3, le=CHART_MAX_POINTS),
+    method: str = "lttb",
+    validators: dict = Depends(admin_rounds_validators),
+):
+    try:
+        if method not in DOWNSAMPLING_METHODS:
+            raise HTTPException(status_code=400, detail=f"Invalid method, expected one of {', '.join(DOWNSAMPLING_METHODS)}")
+        client_ids = parse_clients(clients)
+        metric_names = parse_fields(metrics)
+
+        series = {client_id: await client_series(client_id, metric_names) for client_id in client_ids}
+        # The downsampling is CPU work, kept off the event loop
+        downsampled = await asyncio.to_thread(downsample_series, series, points, method)
+        content = {
+            "method": method,
+            "points": points,
+            "total_rounds": {client_id: len(rounds) for client_id, (rounds, _) in series.items()},
+            "series": downsampled,
+        }
+        return JSONResponse(content=jsonable_encoder(content), headers=validators)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+# This endpoint compares clients: the selected metrics of every requested client (and/or Global) in columnar form,
+# {"rounds": [1, 2, ...], "series": {client_id: {metric: [value or null per round]}}}, read in one pass over Rounds
+# The projection only reads the requested client metrics, pages of limit rounds work as in /get (after=, X-Next-Cursor)
+@router.get("/compare", response_model=dict)
+async def compare_clients(
+    clients: str,
+    metrics: str = "f1",
+    after: int | None = None,
+    limit: int = Query(ROUNDS_PAGE_SIZE, ge=1, le=ROUNDS_PAGE_MAX),
+    validators: dict = Depends(admin_rounds_validators),
+):
+    try:
+        client_ids = parse_clients(clients)
+        metric_names = parse_fields(metrics)
+
+        query = {"round_number": {"$gt": after}} if after is not None else {}
+        projection = {"_id": 0, "round_number": 1, **{f"{client_id}.{name}": 1 for client_id in client_ids for name in metric_names}}
+        cursor = mongodb.db['Rounds'].find(query, projection).sort("round_number", 1).limit(limit + 1)
+
+        rounds = []
+        series = {client_id: {name: [] for name in metric_names} for client_id in client_ids}
+        next_cursor = None
+        async for round in cursor:
+            if len(rounds) == limit:
+                next_cursor = rounds[-1] # There is at least one more round
+                break
+            rounds.append(round["round_number"])
+            for client_id in client_ids:
+                client_metrics = round.get(client_id) or {}
+                for name in metric_names:
+                    series[client_id][name].append(client_metrics.get(name))
+        return page_response({"rounds": rounds, "series": series}, next_cursor, validators)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 # This endpoint retrieves the best F1 score for Global
-# It uses an aggregation pipeline to find the round with the highest F1 score for the Global
+# It is served from the in-memory round summary, with an ETag so polling clients get a 304 until new rounds are posted
 @router.get("/best-f1-global", response_model=dict)
-async def get_best_f1_global(current_user: str = Depends(get_current_active_user)):
+async def get_best_f1_global(request: Request, current_user: str = Depends(get_current_active_user)):
     try:
         # Ensure the user has the correct role or permissions
         if current_user["role"] != "admin":
@@ -136,24 +351,61 @@ async def get_best_f1_global(current_user: str = Depends(get_current_active_user
             detail="Not enough permissions to access this resource"
             )
             
-        pipeline = [
-            {"$match": {"Global": {"$exists": True}}},  # Ensure "Global" field exists
-            {
-                "$project": {
-                    "_id": 0,  # Exclude MongoDB _id field
-                    "round": 1,
-                    "created_at": 1,
-                    "metrics": "$Global",  # Extract the entire "Global" object
-                    "f1": "$Global.f1"  # Extract only the F1 score
-                }
-            },
-            {"$sort": {"f1": -1}},  # Sort by F1 score in descending order
-            {"$limit": 1}  # Keep only the document with the highest Global F1
-        ]
+        summary = await round_summary.get()
+        best_f1_global = summary.best_global()
+        if best_f1_global is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No rounds have been posted yet")
+        return cached_json_response(request, best_f1_global, summary.version_tag, summary.updated_at)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
-        best_f1_global = await mongodb.db["Rounds"].aggregate(pipeline).to_list(1) # Get the best F1 score
+# This endpoint retrieves the whole round summary: number of rounds, best Global round and the best and latest metrics of every client
+@router.get("/summary", response_model=dict)
+async def get_round_summary(request: Request, current_user: str = Depends(get_current_active_user)):
+    try:
+        # Ensure the user has the correct role or permissions
+        if current_user["role"] != "admin":
+            raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions to access this resource"
+            )
 
-        return best_f1_global[0]
-    
+        summary = await round_summary.get()
+        return cached_json_response(request, summary.as_dict(), summary.version_tag, summary.updated_at)
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+# This endpoint is a Server-Sent Events stream that tells the dashboard about new rounds instead of it polling the routes above
+# Each push sends a "rounds" event with the added or changed rounds (same format as the response of /post)
+# A "resync" event means the dashboard should fetch the rounds again: after a replacement, a push handled by another worker,
+# a reconnect that missed events (Last-Event-ID is the rounds version) or when the dashboard fell too far behind
+@router.get("/events")
+async def get_round_events(last_event_id: str | None = Header(None), current_user: str = Depends(get_current_active_user)):
+    try:
+        # Ensure the user has the correct role or permissions
+        if current_user["role"] != "admin":
+            raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions to access this resource"
+            )
+
+        summary = await round_summary.get()
+        subscriber = event_broadcaster.subscribe()
+        if last_event_id is not None and last_event_id != str(summary.version):
+            subscriber.put(resync_event(summary.version))
+        return StreamingResponse(
+            event_broadcaster.stream(subscriber),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}, # No caching or proxy buffering of the stream
+        )
+    except TooManySubscribers as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
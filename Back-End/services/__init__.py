@@ -0,0 +1 @@
+# Necessary for the routes to be recognized by the app
\ No newline at end of file
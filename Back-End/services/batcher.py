@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import os
+
+import torch
+import torch.nn.functional as F
+
+from config.settings import BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS, INFERENCE_WORKERS, INFERENCE_MAX_PENDING, INFERENCE_TORCH_THREADS
+from services.executor import BoundedExecutor
+from services.model_registry import model_registry
+from services.preprocessing import INPUT_SIZE
+
+logger = logging.getLogger("app")
+
+# Bound torch's intra-op thread pool so a forward pass leaves CPU for the event loop and the other workers
+torch.set_num_threads(INFERENCE_TORCH_THREADS or max(1, (os.cpu_count() or 1) // 2))
+
+# Thread pool for image preprocessing and forward passes, shared by all prediction routes
+inference_executor = BoundedExecutor("inference", INFERENCE_WORKERS, INFERENCE_MAX_PENDING)
+
+# Run one forward pass over a batch of preprocessed images and return the softmax probabilities per image
+def predict_probabilities(model, batch: torch.Tensor) -> list[list[float]]:
+    with torch.no_grad():
+        output = model(batch) # Forward pass through the model
+        probabilities = F.softmax(output, dim=1)  # Convert logits to probabilities
+    return probabilities.tolist()
+
+# Collects the images of concurrent prediction requests into batches
+# The first image of a batch waits at most max_wait_ms for others, and a batch never holds more than max_batch_size images
+# Each request gets back its own row of probabilities together with the model version that produced it
+class InferenceBatcher:
+    def __init__(self, registry=model_registry, executor=inference_executor, max_batch_size: int = BATCH_MAX_SIZE, max_wait_ms: float = BATCH_MAX_WAIT_MS):
+        self.registry = registry
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = None  # Created in the running event loop on first use
+        self._worker = None
+        self.ready = False  # Set once warm_up() has loaded the model and run it
+
+        # Counters to see how well requests are being grouped
+        self.batches = 0
+        self.images = 0
+
+    # Queue a preprocessed image tensor (C, H, W) and wait for its probabilities
+    async def submit(self, image: torch.Tensor):
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((image, future))
+        return await future
+
+    # Load the current model and run dummy forward passes at batch size 1 and max_batch_size
+    # so the first real requests do not pay for the download, lazy kernel setup and allocator growth
+    async def warm_up(self):
+        loaded = await self.registry.get()
+        for batch_size in sorted({1, self.max_batch_size}):
+            dummy = torch.zeros(batch_size, 3, INPUT_SIZE[1], INPUT_SIZE[0])
+            await self.executor.run(predict_probabilities, loaded.model, dummy)
+        self.ready = True
+        logger.info(f"Model '{self.registry.model_name}' loaded and warmed up (file_id {loaded.file_id})")
+
+    # Stop the background worker (called when the app shuts down)
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+        self._queue = None
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "images": self.images,
+            "avg_batch_size": round(self.images / self.batches, 2) if self.batches else 0.0,
+        }
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    # Wait for the first image, then gather more until the batch is full or the wait time is over
+    async def _collect(self):
+        items = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(items) < self.max_batch_size:
+            try:
+                items.append(self._queue.get_nowait()) # Take whatever is already queued first
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                items.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # Skip requests that were cancelled while waiting (eg. the client disconnected)
+        return [(image, future) for image, future in items if not future.done()]
+
+    async def _run(self):
+        while True:
+            items = await self._collect()
+            if not items:
+                continue
+            try:
+                loaded = await self.registry.get()
+                batch = torch.stack([image for image, _ in items])
+                rows = await self.executor.run(predict_probabilities, loaded.model, batch) # Off the event loop
+            except Exception as e:
+                logger.error(f"Batch of {len(items)} predictions failed: {e}")
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.images += len(items)
+            for (_, future), row in zip(items, rows):
+                if not future.done():
+                    future.set_result((row, loaded))
+
+# Shared batcher used by the prediction routes
+inference_batcher = InferenceBatcher()
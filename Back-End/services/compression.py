@@ -0,0 +1,128 @@
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from config.settings import COMPRESSION_MINIMUM_SIZE, GZIP_LEVEL, BROTLI_QUALITY
+
+try:
+    import brotli # Optional, br is only offered when it is installed
+except ImportError:
+    brotli = None
+
+# Content types worth compressing, text/event-stream is left out so that each event reaches the browser right away
+COMPRESSIBLE_TYPES = {
+    "application/json", "application/x-ndjson", "application/javascript", "image/svg+xml",
+    "text/html", "text/css", "text/javascript", "text/plain",
+}
+
+# Content coding to use for an Accept-Encoding header, br over gzip when both are accepted, None for no compression
+def choose_encoding(accept_encoding: str) -> str | None:
+    qualities = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[name.strip()] = quality
+    for encoding in ("br", "gzip") if brotli is not None else ("gzip",):
+        if qualities.get(encoding, qualities.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+# ETag of the compressed representation, a strong ETag has to change with the bytes ("v1" -> "v1-gzip")
+# services/http_cache.py removes the suffix again when comparing If-None-Match
+def encoded_etag(etag: str, encoding: str) -> str:
+    return f'{etag[:-1]}-{encoding}"' if etag.endswith('"') else etag
+
+# Incremental compressor, every chunk is flushed so that streamed responses (NDJSON) are not held back
+class Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31) # wbits 31 writes the gzip header and trailer
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data) + (self._compressor.finish() if final else self._compressor.flush())
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+# ASGI middleware that compresses responses of the compressible types from minimum_size bytes
+# Streamed responses are always compressed (their size is not known up front), chunk by chunk
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESSION_MINIMUM_SIZE, gzip_level: int = GZIP_LEVEL, brotli_quality: int = BROTLI_QUALITY):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        encoding = choose_encoding(request_headers.get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None # http.response.start, held until the first body message decides whether to compress
+        compressor = None
+
+        async def send_compressed(message):
+            nonlocal start, compressor
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                if start is not None: # Eg. http.response.pathsend, sent as it is
+                    await send(start)
+                    start = None
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                headers = MutableHeaders(raw=start["headers"])
+                # Responses passed through BaseHTTPMiddleware (slowapi) always arrive in chunks, Content-Length still gives their size
+                # Without it the size is only known for a single chunk, streamed responses are compressed whatever their size
+                size = int(headers["content-length"]) if "content-length" in headers else None if more_body else len(body)
+                if start["status"] == 304 and "etag" in headers:
+                    self.match_etag(headers, encoding, request_headers.get("if-none-match", ""))
+                elif self.compressible(start["status"], headers) and (size is None or size >= self.minimum_size):
+                    compressor = Compressor(encoding, self.gzip_level, self.brotli_quality)
+                    body = compressor.compress(body, final=not more_body)
+                    headers["Content-Encoding"] = encoding
+                    headers.add_vary_header("Accept-Encoding")
+                    if "etag" in headers:
+                        headers["ETag"] = encoded_etag(headers["etag"], encoding)
+                    if more_body:
+                        del headers["Content-Length"]
+                    else:
+                        headers["Content-Length"] = str(len(body))
+                    message = {**message, "body": body}
+                await send(start)
+                start = None
+            elif compressor is not None:
+                message = {**message, "body": compressor.compress(body, final=not more_body)}
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
+
+    # A 304 carries the ETag of the representation the client has, the compressed one if that is what it sent in If-None-Match
+    @staticmethod
+    def match_etag(headers: MutableHeaders, encoding: str, if_none_match: str):
+        etag = encoded_etag(headers["etag"], encoding)
+        if etag.removeprefix("W/") in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+            headers["ETag"] = etag
+
+    @staticmethod
+    def compressible(status_code: int, headers: MutableHeaders) -> bool:
+        if status_code < 200 or status_code in (204, 206, 304) or "content-encoding" in headers:
+            return False
+        return headers.get("content-type", "").split(";")[0].strip().lower() in COMPRESSIBLE_TYPES
@@ -0,0 +1,60 @@
+import numpy as np
+
+# Downsampling of chart series (x = round numbers, y = metric values) to a fixed number of points
+# Both functions return the indices of the points to keep, in increasing order, so x and y (or other columns) can be indexed with them
+DOWNSAMPLING_METHODS = ("lttb", "minmax")
+
+# Largest-Triangle-Three-Buckets: keeps the first and last points and, in each bucket in between, the point that forms
+# the largest triangle with the previously kept point and the average of the next bucket, which preserves the shape of the line
+# Each bucket depends on the point kept in the previous one, so there is one loop iteration per output point, the work inside is vectorized
+def lttb(x: np.ndarray, y: np.ndarray, points: int) -> np.ndarray:
+    n = len(x)
+    if points >= n or points < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Bucket edges over the points between the first and the last one
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    # Average point of every bucket (used as the third corner of the triangle for the bucket before it)
+    counts = np.diff(edges)
+    x_means = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / counts
+    y_means = np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / counts
+
+    kept = np.empty(points, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_x = x_means[bucket + 1] if bucket + 1 < len(x_means) else x[n - 1]
+        next_y = y_means[bucket + 1] if bucket + 1 < len(y_means) else y[n - 1]
+        # Twice the triangle areas, the factor does not change which one is the largest
+        areas = np.abs((x[previous] - next_x) * (y[start:end] - y[previous]) - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        kept[bucket + 1] = previous
+    return kept
+
+# Min/max bucketing: splits the points in points // 2 buckets of consecutive points and keeps the lowest and highest point
+# of each one, so spikes are never lost (fully vectorized)
+def minmax(x: np.ndarray, y: np.ndarray, points: int) -> np.ndarray:
+    n = len(x)
+    buckets = points // 2
+    if points >= n or buckets < 1:
+        return np.arange(n)
+
+    y = np.asarray(y)
+    starts = np.linspace(0, n, buckets + 1).astype(np.int64)[:-1]
+    bucket_of_point = np.repeat(np.arange(buckets), np.diff(np.append(starts, n)))
+    kept = []
+    for extremes in (np.minimum.reduceat(y, starts), np.maximum.reduceat(y, starts)):
+        # First point of each bucket equal to the bucket's extreme
+        candidates = np.flatnonzero(y == extremes[bucket_of_point])
+        _, first = np.unique(bucket_of_point[candidates], return_index=True)
+        kept.append(candidates[first])
+    return np.unique(np.concatenate(kept))
+
+# Indices to keep with the given method
+def downsample(x: np.ndarray, y: np.ndarray, points: int, method: str = "lttb") -> np.ndarray:
+    if method not in DOWNSAMPLING_METHODS:
+        raise ValueError(f"Unknown downsampling method '{method}', expected one of {', '.join(DOWNSAMPLING_METHODS)}")
+    return lttb(x, y, points) if method == "lttb" else minmax(x, y, points)
@@ -0,0 +1,129 @@
+import asyncio
+import json
+import logging
+
+from fastapi.encoders import jsonable_encoder
+
+from config.db import mongodb
+from config.settings import EVENTS_QUEUE_SIZE, EVENTS_MAX_SUBSCRIBERS, EVENTS_KEEPALIVE, ROUND_SUMMARY_CHECK_INTERVAL
+from services.round_ingestion import RoundsUpdate, add_ingestion_listener, public_round, rounds_version
+
+logger = logging.getLogger("app")
+
+# Raised by subscribe() when EVENTS_MAX_SUBSCRIBERS streams are already open
+class TooManySubscribers(Exception):
+    pass
+
+KEEPALIVE = b": keepalive\n\n" # Comment line, ignored by EventSource but keeps proxies from closing an idle connection
+
+# One Server-Sent Event in the text/event-stream format, the ID is the rounds version (sent back as Last-Event-ID on reconnect)
+def format_event(event: str, data: dict, event_id: int | None = None) -> bytes:
+    lines = [] if event_id is None else [f"id: {event_id}"]
+    lines += [f"event: {event}", f"data: {json.dumps(jsonable_encoder(data), separators=(',', ':'))}"]
+    return ("\n".join(lines) + "\n\n").encode()
+
+# Event telling a dashboard to fetch the rounds again (after a replacement, a push handled by another worker or when it fell behind)
+def resync_event(version: int | None) -> bytes:
+    return format_event("resync", {"version": version}, version)
+
+# Event with the rounds added or changed by a push, in the same format as the response of POST /api/post
+def rounds_event(update: RoundsUpdate) -> bytes:
+    data = {"version": update.version, "updated_at": update.updated_at, "rounds": [public_round(document) for document in update.delta]}
+    return format_event("rounds", data, update.version)
+
+# One open event stream, with a bounded buffer of events not yet sent
+class Subscriber:
+    def __init__(self, queue_size: int):
+        self.queue = asyncio.Queue(queue_size)
+        self.overflows = 0
+
+    # Never waits: when the buffer is full the dashboard is too slow, its pending events are dropped and replaced by a resync
+    def put(self, message: bytes, version: int | None = None):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(resync_event(version))
+            self.overflows += 1
+
+# Fans the ingestion updates out to the open event streams of this worker
+# Pushes handled by another worker are noticed by a watcher that checks the rounds version while streams are open
+# (one query per check interval for the whole worker, not per dashboard), those are sent as a resync
+class EventBroadcaster:
+    def __init__(self, queue_size: int = EVENTS_QUEUE_SIZE, max_subscribers: int = EVENTS_MAX_SUBSCRIBERS, check_interval: float = ROUND_SUMMARY_CHECK_INTERVAL):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.check_interval = check_interval
+        self.subscribers = set()
+        self.version = None # Last rounds version sent, None until the first update or check
+        self._watcher = None
+
+        # Counters exposed through stats()
+        self.published = 0
+        self.overflows = 0
+
+    def subscribe(self) -> Subscriber:
+        if len(self.subscribers) >= self.max_subscribers:
+            raise TooManySubscribers(f"{len(self.subscribers)} event streams are already open")
+        subscriber = Subscriber(self.queue_size)
+        self.subscribers.add(subscriber)
+        if self._watcher is None:
+            self._watcher = asyncio.create_task(self._watch())
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+        self.overflows += subscriber.overflows
+        if not self.subscribers and self._watcher is not None:
+            self._watcher.cancel()
+            self._watcher = None
+
+    def publish(self, message: bytes):
+        for subscriber in list(self.subscribers):
+            subscriber.put(message, self.version)
+        self.published += 1
+
+    # Ingestion listener, a replacement may also have removed rounds so the dashboards reload instead
+    def apply(self, update: RoundsUpdate):
+        self.version = update.version
+        if self.subscribers:
+            self.publish(resync_event(update.version) if update.mode == "replace" else rounds_event(update))
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                version, _ = await rounds_version(mongodb.db)
+            except Exception as e:
+                logger.warning(f"Could not check the rounds version for the event streams: {e}")
+                continue
+            if self.version is not None and version > self.version:
+                self.version = version
+                self.publish(resync_event(version))
+            elif self.version is None:
+                self.version = version
+
+    # Body of one event stream, yields the events of the subscriber and a keepalive comment when idle
+    # A closed connection is noticed on the next write, the subscriber is removed when the generator ends
+    async def stream(self, subscriber: Subscriber, keepalive: float = EVENTS_KEEPALIVE):
+        try:
+            yield KEEPALIVE # Sends the headers right away so the dashboard knows the stream is open
+            while True:
+                try:
+                    yield await asyncio.wait_for(subscriber.queue.get(), keepalive)
+                except asyncio.TimeoutError:
+                    yield KEEPALIVE
+        finally:
+            self.unsubscribe(subscriber)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self.subscribers),
+            "version": self.version,
+            "published": self.published,
+            "overflows": self.overflows + sum(subscriber.overflows for subscriber in self.subscribers),
+        }
+
+event_broadcaster = EventBroadcaster()
+add_ingestion_listener(event_broadcaster.apply)
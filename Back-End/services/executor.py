@@ -0,0 +1,69 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+# Raised when an executor already has max_pending requests admitted
+# main.py turns it into a 503 response so clients back off instead of queueing forever
+class ExecutorSaturated(Exception):
+    def __init__(self, name: str):
+        super().__init__(f"The {name} executor is saturated.")
+        self.name = name
+
+# Thread pool for CPU-bound work (eg. image decoding, inference, password hashing) so it does not block the event loop
+# Requests are admitted through slot(), which caps how many can be waiting or running at once (backpressure)
+class BoundedExecutor:
+    def __init__(self, name: str, max_workers: int, max_pending: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._pending = 0 # Admitted requests that have not finished yet
+
+        # Counters exposed through stats()
+        self.completed = 0
+        self.rejected = 0
+
+    # Admit one request, or raise ExecutorSaturated if max_pending requests are already admitted
+    # Only touched from the event loop, so the counter needs no lock
+    def acquire(self):
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise ExecutorSaturated(self.name)
+        self._pending += 1
+
+    # Give back a slot taken with acquire()
+    def release(self):
+        self._pending -= 1
+        self.completed += 1
+
+    # acquire()/release() around a block of code
+    @asynccontextmanager
+    async def slot(self):
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    # Run fn(*args) on the pool and wait for the result without blocking the event loop
+    async def run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, functools.partial(fn, *args, **kwargs))
+
+    # Admit and run a single call
+    async def submit(self, fn, *args, **kwargs):
+        async with self.slot():
+            return await self.run(fn, *args, **kwargs)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
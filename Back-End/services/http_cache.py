@@ -0,0 +1,109 @@
+import asyncio
+import hashlib
+import time
+from datetime import datetime
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+from config.db import mongodb
+from config.settings import ROUND_SUMMARY_CHECK_INTERVAL
+from services.round_ingestion import RoundsUpdate, add_ingestion_listener, rounds_version
+
+# Suffixes added to the ETag of compressed responses by services/compression.py
+ENCODING_SUFFIXES = ("-gzip", "-br")
+
+# ETag as compared for If-None-Match: without W/ (weak comparison) and without the suffix of a compressed representation
+def base_etag(tag: str) -> str:
+    tag = tag.strip().removeprefix("W/")
+    for suffix in ENCODING_SUFFIXES:
+        if tag.endswith(f'{suffix}"'):
+            return tag[:-len(suffix) - 1] + '"'
+    return tag
+
+# True when the client's copy (If-None-Match / If-Modified-Since) is still current
+# If-None-Match takes precedence over If-Modified-Since, as in RFC 9110
+def not_modified(request: Request, etag: str, last_modified: datetime | None = None) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [base_etag(tag) for tag in if_none_match.split(",")]
+        return "*" in tags or base_etag(etag) in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            return last_modified.replace(microsecond=0) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+# ETag, Last-Modified and Cache-Control headers of a cacheable response
+# no-cache lets browsers keep the response but makes them revalidate it on every use, private because it needs a session
+def cache_headers(etag: str, last_modified: datetime | None = None) -> dict:
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if last_modified:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    return headers
+
+# JSON response for a data version with ETag and Last-Modified, or an empty 304 when the client already has it
+def cached_json_response(request: Request, content, version_tag: str, last_modified: datetime | None = None) -> Response:
+    etag = request_etag(request, version_tag)
+    headers = cache_headers(etag, last_modified)
+    if not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=jsonable_encoder(content), headers=headers)
+
+# Strong ETag of one response of a data version: the version plus a digest of the path and query string,
+# so that different pages, clients or fields of the same version do not share an ETag
+def request_etag(request: Request, version_tag: str) -> str:
+    query = "&".join(sorted(request.url.query.split("&")))
+    digest = hashlib.sha256(f"{request.url.path}?{query}".encode()).hexdigest()[:16]
+    return f'"{version_tag}-{digest}"'
+
+# Cache headers of the response to a request for a data version, raises a 304 when the client already has it
+def check_not_modified(request: Request, version_tag: str, last_modified: datetime | None = None) -> dict:
+    etag = request_etag(request, version_tag)
+    headers = cache_headers(etag, last_modified)
+    if not_modified(request, etag, last_modified):
+        raise HTTPException(status_code=304, headers=headers)
+    return headers
+
+# Rounds version as known by this worker, so the ETags of the round routes are checked without reading the rounds
+# Pushes handled by this worker update it right away (ingestion listener), pushes handled by another worker are
+# noticed at most check_interval later (one read of the Metadata document per interval for the whole worker)
+class RoundsVersion:
+    def __init__(self, check_interval: float = ROUND_SUMMARY_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self.version = None # None until the first check
+        self.updated_at = None
+        self._last_check = 0.0 # time.monotonic() of the last check
+        self._lock = asyncio.Lock()
+
+    async def get(self, db=None) -> tuple[int, datetime | None]:
+        db = db if db is not None else mongodb.db
+        if self.version is not None and time.monotonic() - self._last_check < self.check_interval:
+            return self.version, self.updated_at
+        async with self._lock:
+            if self.version is None or time.monotonic() - self._last_check >= self.check_interval:
+                version, updated_at = await rounds_version(db)
+                self._last_check = time.monotonic()
+                if self.version is None or version > self.version:
+                    self.version, self.updated_at = version, updated_at
+            return self.version, self.updated_at
+
+    # Ingestion listener
+    def apply(self, update: RoundsUpdate):
+        if self.version is None or update.version > self.version:
+            self.version, self.updated_at = update.version, update.updated_at
+
+rounds_data_version = RoundsVersion()
+add_ingestion_listener(rounds_data_version.apply)
+
+# Dependency of the routes that read the rounds from the database: their responses carry an ETag of the rounds version,
+# so a client that already has the current version gets a 304 without a database read, otherwise the cache headers
+# of the response are returned. Checks that must come before a 304 (eg. the role) belong in a dependency that wraps this one
+async def rounds_validators(request: Request) -> dict:
+    version, updated_at = await rounds_data_version.get()
+    return check_not_modified(request, f"rounds-{version}", updated_at)
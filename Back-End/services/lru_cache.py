@@ -0,0 +1,58 @@
+import time
+from collections import OrderedDict
+
+# In-process LRU cache with an optional time to live
+# Holds at most max_entries values, each for at most ttl seconds (0 keeps them until they are evicted)
+# put() can also be given an absolute expiry time (time.time()), the earlier of the two wins
+# Only used from the event loop, so it needs no lock
+class LRUCache:
+    def __init__(self, max_entries: int, ttl: float = 0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict() # key -> (expires_at, value), least recently used first
+
+        # Counters exposed through stats()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None or (entry[0] is not None and entry[0] <= time.time()):
+            if entry is not None:
+                del self._entries[key] # Expired
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, value, expires_at: float = None):
+        if self.max_entries <= 0:
+            return
+        if self.ttl > 0:
+            expires_at = min(expires_at or float("inf"), time.time() + self.ttl)
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False) # Evict the least recently used entry
+
+    def pop(self, key):
+        entry = self._entries.pop(key, None)
+        return entry[1] if entry else None
+
+    # Remove every entry whose value matches the predicate
+    def pop_where(self, predicate):
+        for key in [key for key, (_, value) in self._entries.items() if predicate(value)]:
+            del self._entries[key]
+
+    # Drop every entry
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
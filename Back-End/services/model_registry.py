@@ -0,0 +1,156 @@
+import asyncio
+import io
+import logging
+import time
+from typing import Any, NamedTuple
+
+import torch
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket  # async GridFS
+
+from config.db import mongodb
+from config.settings import MODEL_NAME, MODEL_CHECK_INTERVAL, INFERENCE_BACKEND
+from models.ClientModel import ClientModel
+from services.model_variants import build_checked_variant
+
+logger = logging.getLogger("app")
+
+# Dynamically create the GridFS bucket
+def get_gridfs_bucket():
+    return AsyncIOMotorGridFSBucket(mongodb.db)
+
+# A model that has been loaded into memory, together with the GridFS file it came from
+# backend is the inference backend actually built, fp32 when the configured one fell back
+class LoadedModel(NamedTuple):
+    model: Any
+    file_id: Any
+    upload_date: Any
+    backend: str = "fp32"
+
+# Keeps the latest model in memory so it is not downloaded from GridFS on every prediction
+# The models collection is only queried for the latest file_id (metadata only) at most once per check_interval,
+# or right away after notify() is called (eg. after the FL server uploads a new model)
+# A new version is fully loaded before it replaces the current one, so requests never see a half-loaded model
+class ModelRegistry:
+    def __init__(self, model_name: str = MODEL_NAME, check_interval: float = MODEL_CHECK_INTERVAL, backend: str = INFERENCE_BACKEND):
+        self.model_name = model_name
+        self.check_interval = check_interval
+        self.backend = backend # Inference backend built from every loaded model (see services/model_variants.py)
+        self._current = None  # LoadedModel currently served
+        self._pushed_file_id = None  # file_id pushed through notify(), used instead of querying the metadata
+        self._last_check = 0.0  # time.monotonic() of the last metadata check
+        self._lock = asyncio.Lock()  # Only one coroutine checks/loads at a time
+        self._listeners = []  # Called with the new LoadedModel after every swap
+
+        # Counters exposed through stats()
+        self.hits = 0  # Served from memory
+        self.misses = 0  # Had to download and build the model
+        self.reloads = 0  # Misses that replaced an already loaded version
+        self.failures = 0  # Checks or loads that failed while a model was loaded
+
+    # Returns the current LoadedModel, loading or hot-swapping it when a newer upload exists
+    async def get(self) -> LoadedModel:
+        current = self._current
+        if current is not None and not self._check_due():
+            self.hits += 1
+            return current
+
+        async with self._lock:
+            # Another coroutine may have checked or loaded while this one waited for the lock
+            current = self._current
+            if current is not None and not self._check_due():
+                self.hits += 1
+                return current
+
+            try:
+                file_id = await self._latest_file_id()
+                self._last_check = time.monotonic()
+                if current is not None and current.file_id == file_id:
+                    self.hits += 1
+                    return current
+
+                self.misses += 1
+                loaded = await self._load(file_id)
+            except Exception as e:
+                if current is None:
+                    raise # Nothing to fall back to
+                # Keep serving the loaded model (eg. the database is briefly unreachable or the new upload is corrupt),
+                # the next check is made after check_interval
+                self._last_check = time.monotonic()
+                self.failures += 1
+                logger.warning(f"Model '{self.model_name}' check failed, serving {current.file_id}: {e}")
+                return current
+            if current is not None:
+                self.reloads += 1
+                logger.info(f"Model '{self.model_name}' reloaded: {current.file_id} -> {file_id}")
+            self._current = loaded  # Single assignment, so the swap is atomic for readers
+            for listener in self._listeners:
+                listener(loaded)
+            return loaded
+
+    # Tell the registry that a new version was uploaded
+    # If the file_id is known it is used directly, otherwise the next get() checks the metadata right away
+    def notify(self, file_id=None):
+        self._pushed_file_id = file_id
+        self._last_check = 0.0
+
+    # Register a callback that is called with the new LoadedModel whenever a new version is swapped in
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    # Hit/miss/reload counters and the version being served
+    def stats(self) -> dict:
+        current = self._current
+        return {
+            "model_name": self.model_name,
+            "backend": current.backend if current else None,
+            "configured_backend": self.backend,
+            "file_id": str(current.file_id) if current else None,
+            "model_upload_date": str(current.upload_date) if current else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "reloads": self.reloads,
+            "failures": self.failures,
+        }
+
+    def _check_due(self) -> bool:
+        return self._pushed_file_id is not None or time.monotonic() - self._last_check >= self.check_interval
+
+    # Get the file_id of the latest model without downloading it
+    async def _latest_file_id(self):
+        if self._pushed_file_id is not None:
+            file_id, self._pushed_file_id = self._pushed_file_id, None
+            return file_id
+
+        model_metadata = await mongodb.db.models.find_one(
+            {"model_name": self.model_name}, {"file_id": 1}, sort=[("_id", -1)]
+        )  # Get the latest model
+        if not model_metadata:
+            raise ValueError("Model not found in database.")
+        return model_metadata["file_id"]
+
+    # Download the model from GridFS and build it
+    async def _load(self, file_id) -> LoadedModel:
+        fs = get_gridfs_bucket()
+        # Retrieve the uploadDate from fs.files metadata
+        file_metadata = await mongodb.db.fs.files.find_one({"_id": file_id}, {"uploadDate": 1})
+        if not file_metadata:
+            raise ValueError("Model file not found in GridFS.")
+        upload_date = file_metadata["uploadDate"]
+
+        # Open the GridFS download stream
+        grid_out = await fs.open_download_stream(file_id)
+        model_bytes = await grid_out.read()
+
+        # Build the model in a thread, torch.load of the state dict is CPU-bound
+        model, backend = await asyncio.to_thread(self._build_model, model_bytes)
+        return LoadedModel(model, file_id, upload_date, backend)
+
+    # Load the model from bytes and build the configured inference backend from it, returns the model and the backend built
+    def _build_model(self, model_bytes: bytes) -> tuple[Any, str]:
+        model = ClientModel()
+        model.load_state_dict(torch.load(io.BytesIO(model_bytes), map_location=torch.device("cpu")))
+        model.eval()
+        return build_checked_variant(model, self.backend)
+
+# Shared registry used by the prediction routes
+model_registry = ModelRegistry()
@@ -0,0 +1,67 @@
+import logging
+
+import torch
+import torch.nn as nn
+
+from services.preprocessing import INPUT_SIZE
+
+logger = logging.getLogger("app")
+
+# Inference backends that can be selected with INFERENCE_BACKEND
+# fp32: the eager model as trained
+# int8: Linear layers dynamically quantized to int8 (the 100352x128 classifier layer is most of the weights)
+# torchscript: traced and frozen TorchScript graph of the fp32 model
+# int8-torchscript: both of the above
+MODEL_VARIANTS = ("fp32", "int8", "torchscript", "int8-torchscript")
+
+# Largest difference in any class probability allowed between a variant and the fp32 model on the parity inputs
+# Checked on probabilities rather than predicted classes, the random parity inputs can give near ties that flip on tiny differences
+PARITY_MAX_PROB_DIFF = 0.01
+
+# Fixed set of inputs used for the parity check, the same every time for a given count
+def parity_inputs(count: int = 8) -> torch.Tensor:
+    generator = torch.Generator().manual_seed(0)
+    return torch.randn(count, 3, INPUT_SIZE[1], INPUT_SIZE[0], generator=generator)
+
+# Build the requested variant of an fp32 model in eval mode
+def build_variant(model: nn.Module, variant: str) -> nn.Module:
+    if variant not in MODEL_VARIANTS:
+        raise ValueError(f"Unknown inference backend '{variant}', expected one of {', '.join(MODEL_VARIANTS)}")
+    model = model.eval()
+
+    if variant.startswith("int8"):
+        model = torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+    if variant.endswith("torchscript"):
+        with torch.no_grad():
+            model = torch.jit.freeze(torch.jit.trace(model, parity_inputs(1)).eval())
+    return model
+
+# Compare a variant with the fp32 model on a fixed set of inputs
+# Returns the share of inputs with the same predicted class and the largest probability difference
+def check_parity(reference: nn.Module, candidate: nn.Module, inputs: torch.Tensor = None) -> dict:
+    inputs = parity_inputs() if inputs is None else inputs
+    with torch.no_grad():
+        expected = torch.softmax(reference(inputs), dim=1)
+        actual = torch.softmax(candidate(inputs), dim=1)
+    return {
+        "agreement": (expected.argmax(dim=1) == actual.argmax(dim=1)).float().mean().item(),
+        "max_prob_diff": (expected - actual).abs().max().item(),
+    }
+
+# Build the configured variant, falling back to the fp32 model if it cannot be built or does not match it
+# Returns the model and the name of the backend it actually is, "fp32" after a fallback
+def build_checked_variant(model: nn.Module, variant: str) -> tuple[nn.Module, str]:
+    if variant == "fp32":
+        return model, "fp32"
+    try:
+        candidate = build_variant(model, variant)
+        parity = check_parity(model, candidate)
+    except Exception as e:
+        logger.warning(f"Could not build the '{variant}' inference backend, using fp32: {e}")
+        return model, "fp32"
+
+    if parity["max_prob_diff"] > PARITY_MAX_PROB_DIFF:
+        logger.warning(f"The '{variant}' inference backend does not match fp32 ({parity}), using fp32")
+        return model, "fp32"
+    logger.info(f"Using the '{variant}' inference backend ({parity})")
+    return candidate, variant
@@ -0,0 +1,30 @@
+from passlib.context import CryptContext # Password hashing library
+
+from config.settings import (
+    ARGON2_TIME_COST, ARGON2_MEMORY_COST, ARGON2_PARALLELISM, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING
+)
+from services.executor import BoundedExecutor
+
+# Password Hashing
+# Recommended by OWASP and defaults to argon2id
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__time_cost=ARGON2_TIME_COST,
+    argon2__memory_cost=ARGON2_MEMORY_COST,
+    argon2__parallelism=ARGON2_PARALLELISM,
+)
+
+# Argon2 takes tens of milliseconds of CPU per call, so hashing runs on its own small pool instead of the event loop
+# When too many hashes are queued (eg. a burst of logins) new requests get a 503 instead of waiting
+password_executor = BoundedExecutor("password", PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
+
+async def hash_password(password: str) -> str:
+    return await password_executor.submit(pwd_context.hash, password)
+
+async def verify_password(password: str, hashed_password: str) -> bool:
+    return await password_executor.submit(pwd_context.verify, password, hashed_password)
+
+# True when a hash was made with other parameters than the current ones (cheap, only parses the hash)
+def needs_rehash(hashed_password: str) -> bool:
+    return pwd_context.needs_update(hashed_password)
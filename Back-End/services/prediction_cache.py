@@ -0,0 +1,11 @@
+import hashlib
+
+from config.settings import PREDICTION_CACHE_MAX_ENTRIES, PREDICTION_CACHE_TTL
+from services.lru_cache import LRUCache
+
+# Hash of the uploaded bytes, used as part of the cache key
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+# Prediction results keyed by (content hash, model file_id), shared by the prediction routes
+prediction_cache = LRUCache(PREDICTION_CACHE_MAX_ENTRIES, PREDICTION_CACHE_TTL)
@@ -0,0 +1,44 @@
+import io
+
+import numpy as np
+import torch
+from PIL import Image # Pillow library for image processing
+
+from config.settings import MAX_IMAGE_PIXELS
+
+# Size of the model input (width, height)
+INPUT_SIZE = (224, 224)
+
+# ImageNet normalization, same values as the transforms.Normalize used in the notebook
+MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+# ToTensor (/ 255) and Normalize ((x - mean) / std) folded into one multiply-add per pixel: x * scale + offset
+_SCALE = 1.0 / (255.0 * STD)
+_OFFSET = -MEAN / STD
+
+# Raised when an image has more pixels than MAX_IMAGE_PIXELS
+class ImageTooLarge(ValueError):
+    pass
+
+# Open an image and check its dimensions from the header, before any pixel data is decoded
+def open_image(data: bytes, max_pixels: int = MAX_IMAGE_PIXELS) -> Image.Image:
+    image = Image.open(io.BytesIO(data)) # Lazy, only the header is read here
+    width, height = image.size
+    if width * height > max_pixels:
+        raise ImageTooLarge(f"Image is {width}x{height}, the limit is {max_pixels} pixels")
+    return image
+
+# Decode an uploaded image and turn it into a normalized model input tensor (3, 224, 224)
+# Returns the tensor and the original size of the image (width, height)
+# JPEGs are decoded in draft mode, which lets libjpeg scale them down by 1/2, 1/4 or 1/8 while decoding
+# (never below INPUT_SIZE), so a large microscopy image is never decoded at full resolution
+def preprocess_image(data: bytes, max_pixels: int = MAX_IMAGE_PIXELS):
+    image = open_image(data, max_pixels)
+    original_size = image.size
+    if image.format == "JPEG":
+        image.draft("RGB", INPUT_SIZE)
+
+    image = image.convert("RGB").resize(INPUT_SIZE, Image.BILINEAR) # Same filter as transforms.Resize
+    array = np.asarray(image, dtype=np.float32) * _SCALE + _OFFSET # (H, W, 3)
+    return torch.from_numpy(array.transpose(2, 0, 1).copy()), original_size
@@ -0,0 +1,119 @@
+import sqlite3
+import threading
+import time
+from math import floor
+
+from limits.storage import Storage, SlidingWindowCounterSupport
+from limits.storage.base import TimestampedSlidingWindow
+
+# Rate limit storage in a SQLite file, shared by every worker process on the same host
+# Registered for sqlite:// URIs when this module is imported, eg. RATE_LIMIT_STORAGE_URI=sqlite:///ratelimits.db (relative path)
+# or sqlite:////var/lib/app/ratelimits.db (absolute path)
+# Supports the fixed window and sliding window counter strategies, each key is one row so an update is O(1)
+class SQLiteStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    STORAGE_SCHEME = ["sqlite"]
+
+    # Expired rows are deleted every PURGE_EVERY writes, rows of keys that are still used are reset in place
+    PURGE_EVERY = 1000
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        path = uri.split("://", 1)[1]
+        self.path = path[1:] if path.startswith("/") else path
+        self.lock = threading.Lock() # One connection per process, used by one thread at a time
+        self.writes = 0
+
+        # Autocommit mode, transactions are opened explicitly when several statements must be atomic
+        self.connection = sqlite3.connect(self.path, timeout=float(options.get("timeout", 5)), isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL") # Readers do not block the writer
+        self.connection.execute("PRAGMA synchronous=NORMAL") # Counters do not need to survive a power loss
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits (key TEXT PRIMARY KEY, count INTEGER NOT NULL, expires REAL NOT NULL) WITHOUT ROWID"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS rate_limits_expires ON rate_limits (expires)")
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    # Add to a counter, restarting it if it expired, and return the new count in a single statement
+    def _incr(self, key: str, expiry: float, amount: int, now: float) -> int:
+        self.writes += 1
+        if self.writes % self.PURGE_EVERY == 0:
+            self.connection.execute("DELETE FROM rate_limits WHERE expires <= ?", (now,))
+        return self.connection.execute(
+            """
+            INSERT INTO rate_limits (key, count, expires) VALUES (?, ?, ?)
+            ON CONFLICT (key) DO UPDATE SET
+                count = CASE WHEN expires <= ? THEN excluded.count ELSE count + excluded.count END,
+                expires = CASE WHEN expires <= ? THEN excluded.expires ELSE expires END
+            RETURNING count
+            """,
+            (key, amount, now + expiry, now, now),
+        ).fetchone()[0]
+
+    def _get(self, key: str, now: float) -> int:
+        row = self.connection.execute("SELECT count FROM rate_limits WHERE key = ? AND expires > ?", (key, now)).fetchone()
+        return row[0] if row else 0
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        with self.lock:
+            return self._incr(key, expiry, amount, time.time())
+
+    def get(self, key: str) -> int:
+        with self.lock:
+            return self._get(key, time.time())
+
+    def get_expiry(self, key: str) -> float:
+        now = time.time()
+        with self.lock:
+            row = self.connection.execute("SELECT expires FROM rate_limits WHERE key = ? AND expires > ?", (key, now)).fetchone()
+        return row[0] if row else now
+
+    def check(self) -> bool:
+        try:
+            with self.lock:
+                self.connection.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> int:
+        with self.lock:
+            return self.connection.execute("DELETE FROM rate_limits").rowcount
+
+    def clear(self, key: str) -> None:
+        with self.lock:
+            self.connection.execute("DELETE FROM rate_limits WHERE key = ?", (key,))
+
+    # Counts and remaining time to live of the previous and current windows, same weighting as the limits memory storage
+    def _sliding_window(self, key: str, expiry: int, now: float) -> tuple[int, float, int, float]:
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        previous_count = self._get(previous_key, now)
+        current_count = self._get(current_key, now)
+        previous_ttl = 0.0 if previous_count == 0 else (1 - (((now - expiry) / expiry) % 1)) * expiry
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl
+
+    # The check and the increment run in one write transaction, so concurrent workers cannot both take the last slot
+    def acquire_sliding_window_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        now = time.time()
+        with self.lock, self.connection: # Commits the transaction, or rolls it back on an error
+            self.connection.execute("BEGIN IMMEDIATE")
+            previous_count, previous_ttl, current_count, _ = self._sliding_window(key, expiry, now)
+            if floor(previous_count * previous_ttl / expiry + current_count) + amount > limit:
+                return False
+            # The current window is the previous one during the next window, so it is kept for twice the expiry
+            self._incr(self.sliding_window_keys(key, expiry, now)[1], 2 * expiry, amount, now)
+            return True
+
+    def get_sliding_window(self, key: str, expiry: int) -> tuple[int, float, int, float]:
+        with self.lock:
+            return self._sliding_window(key, expiry, time.time())
+
+    def clear_sliding_window(self, key: str, expiry: int) -> None:
+        previous_key, current_key = self.sliding_window_keys(key, expiry, time.time())
+        with self.lock:
+            self.connection.execute("DELETE FROM rate_limits WHERE key IN (?, ?)", (previous_key, current_key))
@@ -0,0 +1,243 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import ValidationError
+from pymongo import DeleteMany, ReplaceOne, ReturnDocument
+
+from config.indexes import ensure_collection_indexes
+from config.settings import INGEST_BATCH_SIZE, INGEST_MAX_LINE_BYTES, INGEST_MAX_REPORTED_ERRORS
+from models.TrainingRound import TrainingRound
+
+logger = logging.getLogger("app")
+
+ROUNDS = "Rounds"
+CLIENT_METRICS = "ClientMetrics" # One document per (client_id, round_number), written next to Rounds
+METADATA = "Metadata" # {"_id": "rounds", "version", "updated_at"}, the version is increased by every push that changes the rounds
+INGESTION_MODES = ("upsert", "replace")
+
+# Raised when an NDJSON upload cannot be read (a line longer than INGEST_MAX_LINE_BYTES)
+class NDJSONError(Exception):
+    pass
+
+# Pushes are applied one at a time in each worker, two full replacements must not share the staging collection
+ingestion_lock = asyncio.Lock()
+
+# A push that changed the rounds, passed to the ingestion listeners
+class RoundsUpdate(NamedTuple):
+    delta: list # Rounds that were added or changed
+    mode: str # upsert or replace (after a replacement rounds may also have been removed)
+    version: int
+    updated_at: datetime
+
+# Called with a RoundsUpdate after every push that changed the rounds (in the worker that handled the push)
+ingestion_listeners = []
+
+def add_ingestion_listener(callback):
+    ingestion_listeners.append(callback)
+
+# Version of the rounds shared by every worker, (0, None) before the first push
+async def rounds_version(db) -> tuple[int, datetime | None]:
+    document = await db[METADATA].find_one({"_id": "rounds"})
+    if not document:
+        return 0, None
+    updated_at = document["updated_at"]
+    return document["version"], updated_at.replace(tzinfo=timezone.utc) if updated_at.tzinfo is None else updated_at
+
+async def bump_rounds_version(db) -> tuple[int, datetime]:
+    document = await db[METADATA].find_one_and_update(
+        {"_id": "rounds"},
+        {"$inc": {"version": 1}, "$set": {"updated_at": datetime.now(timezone.utc)}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return document["version"], document["updated_at"].replace(tzinfo=timezone.utc)
+
+# Document stored for a round, round_number is the round as an integer so rounds can be sorted and looked up through an index
+def round_document(round_dict: dict) -> dict:
+    return {**round_dict, "round_number": int(round_dict["round"])}
+
+# Fields that make up the content of a round, created_at is set when the round is first stored
+def round_content(document: dict) -> dict:
+    return {key: value for key, value in document.items() if key not in ("_id", "created_at")}
+
+# Keep the last version of each round number, the FL server may send a round more than once
+def unique_rounds(round_dicts: list[dict]) -> list[dict]:
+    return list({document["round_number"]: document for document in map(round_document, round_dicts)}.values())
+
+# Stored rounds with the given round numbers (one index lookup per round)
+async def stored_rounds(collection, round_numbers: list[int]) -> dict:
+    cursor = collection.find({"round_number": {"$in": round_numbers}})
+    return {document["round_number"]: document async for document in cursor}
+
+# A stored round as returned by the API: the ID as a string and without the internal round_number
+def public_round(document: dict) -> dict:
+    return {**{key: value for key, value in document.items() if key != "round_number"}, "_id": str(document["_id"])}
+
+# Client IDs of a round: Global and every client_* field
+def round_client_ids(document: dict) -> list[str]:
+    return [key for key in document if key == "Global" or key.startswith("client_")]
+
+# ClientMetrics documents of a round, so the rounds of one client can be read through the (client_id, round_number) index
+def client_metrics_documents(document: dict) -> list[dict]:
+    return [
+        {
+            "client_id": client_id,
+            "round_number": document["round_number"],
+            "round": document["round"],
+            "metrics": document[client_id],
+            "created_at": document.get("created_at"),
+        }
+        for client_id in round_client_ids(document)
+    ]
+
+# Write the ClientMetrics of the given rounds, clients that are no longer part of a round are removed
+async def write_client_metrics(collection, documents: list[dict]):
+    operations = []
+    for document in documents:
+        for metrics in client_metrics_documents(document):
+            operations.append(ReplaceOne({"client_id": metrics["client_id"], "round_number": metrics["round_number"]}, metrics, upsert=True))
+        operations.append(DeleteMany({"round_number": document["round_number"], "client_id": {"$nin": round_client_ids(document)}}))
+    if operations:
+        await collection.bulk_write(operations, ordered=False)
+
+# Fill ClientMetrics from the existing rounds, for databases that have rounds stored before ClientMetrics existed
+async def backfill_client_metrics(db, batch_size: int = INGEST_BATCH_SIZE):
+    if await db[CLIENT_METRICS].estimated_document_count() > 0:
+        return
+    batch, count = [], 0
+    async for document in db[ROUNDS].find({}, {"_id": 0}):
+        batch.append(document)
+        if len(batch) >= batch_size:
+            await write_client_metrics(db[CLIENT_METRICS], batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        await write_client_metrics(db[CLIENT_METRICS], batch)
+        count += len(batch)
+    if count:
+        logger.info(f"Added the client metrics of {count} existing rounds to {CLIENT_METRICS}")
+
+# Rounds that are new or differ from the stored version, they are the only ones written and returned
+def changed_rounds(documents: list[dict], stored: dict) -> list[dict]:
+    return [
+        document for document in documents
+        if document["round_number"] not in stored or round_content(stored[document["round_number"]]) != round_content(document)
+    ]
+
+# Add new rounds and replace the rounds that changed, the other rounds are left untouched
+# Only the changed rounds are written (unordered, so one failure does not stop the others) and returned with their _id
+async def upsert_rounds(db, round_dicts: list[dict]) -> list[dict]:
+    collection = db[ROUNDS]
+    documents = unique_rounds(round_dicts)
+    stored = await stored_rounds(collection, [document["round_number"] for document in documents])
+    delta = changed_rounds(documents, stored)
+    if not delta:
+        return []
+
+    for document in delta:
+        if document["round_number"] in stored: # A changed round keeps its _id and the date it was first stored
+            document["_id"] = stored[document["round_number"]]["_id"]
+            document["created_at"] = stored[document["round_number"]].get("created_at", document.get("created_at"))
+    result = await collection.bulk_write(
+        [ReplaceOne({"round_number": document["round_number"]}, round_content(document) | {"created_at": document.get("created_at")}, upsert=True) for document in delta],
+        ordered=False,
+    )
+    for index, inserted_id in result.upserted_ids.items():
+        delta[index]["_id"] = inserted_id
+    await write_client_metrics(db[CLIENT_METRICS], delta)
+    return delta
+
+# Fill a staging collection with the same indexes as the target and rename it over the target in one step
+async def swap_collection(db, name: str, documents: list[dict]):
+    staging = db[f"{name}_staging_{os.getpid()}"]
+    await staging.drop() # Left over by an interrupted replacement
+    try:
+        if documents:
+            await staging.insert_many(documents)
+        await ensure_collection_indexes(staging, name)
+        await staging.rename(name, dropTarget=True)
+    except Exception:
+        await staging.drop()
+        raise
+
+# Replace every round with the given ones, readers keep seeing the previous rounds until the new ones are complete
+# Rounds and ClientMetrics are each rebuilt in a staging collection that is then renamed over the live one
+async def replace_rounds(db, round_dicts: list[dict]) -> list[dict]:
+    documents = unique_rounds(round_dicts)
+    stored = await stored_rounds(db[ROUNDS], [document["round_number"] for document in documents])
+    delta = changed_rounds(documents, stored)
+
+    await swap_collection(db, ROUNDS, documents)
+    await swap_collection(db, CLIENT_METRICS, [metrics for document in documents for metrics in client_metrics_documents(document)])
+    return delta
+
+# Apply a push of rounds from the FL server and return the rounds that were added or changed
+# When something changed, the rounds version is increased and the ingestion listeners are called
+async def ingest_rounds(db, round_dicts: list[dict], mode: str = "upsert") -> list[dict]:
+    async with ingestion_lock:
+        if mode == "replace":
+            delta = await replace_rounds(db, round_dicts)
+        else:
+            delta = await upsert_rounds(db, round_dicts)
+        if delta or mode == "replace":
+            version, updated_at = await bump_rounds_version(db)
+            update = RoundsUpdate(delta, mode, version, updated_at)
+            for listener in ingestion_listeners:
+                try:
+                    listener(update)
+                except Exception as e:
+                    logger.warning(f"Ingestion listener failed: {e}")
+        return delta
+
+# Yield the lines of a stream of byte chunks (eg. request.stream()), without the line breaks
+# Only one line is held in memory at a time, a line longer than max_line_bytes raises NDJSONError
+async def iter_lines(chunks, max_line_bytes: int = INGEST_MAX_LINE_BYTES):
+    buffer = bytearray()
+    async for chunk in chunks:
+        buffer += chunk
+        start = 0
+        while (end := buffer.find(b"\n", start)) != -1:
+            yield bytes(buffer[start:end]).rstrip(b"\r")
+            start = end + 1
+        del buffer[:start]
+        if len(buffer) > max_line_bytes:
+            raise NDJSONError(f"Line is longer than {max_line_bytes} bytes")
+    if buffer:
+        yield bytes(buffer).rstrip(b"\r")
+
+# Validate one NDJSON line as a TrainingRound, returns the round as stored by the list endpoint
+def parse_round_line(line: bytes) -> dict:
+    return jsonable_encoder(TrainingRound.model_validate_json(line))
+
+# Upsert the rounds of an NDJSON stream (one TrainingRound per line), INGEST_BATCH_SIZE rounds at a time
+# Invalid lines are skipped and reported, so memory only depends on the batch size and not on the upload size
+async def ingest_ndjson(db, lines, batch_size: int = INGEST_BATCH_SIZE) -> dict:
+    summary = {"received": 0, "changed": 0, "invalid": 0, "errors": []}
+    batch = []
+
+    async def flush():
+        summary["changed"] += len(await ingest_rounds(db, batch))
+        batch.clear()
+
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            batch.append(parse_round_line(line))
+        except (ValidationError, ValueError) as e:
+            summary["invalid"] += 1
+            if len(summary["errors"]) < INGEST_MAX_REPORTED_ERRORS:
+                summary["errors"].append({"line": line_number, "error": str(e)})
+            continue
+        summary["received"] += 1
+        if len(batch) >= batch_size:
+            await flush()
+    if batch:
+        await flush()
+    return summary
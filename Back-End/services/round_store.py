@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import time
+
+import numpy as np
+
+from config.db import mongodb
+from config.settings import ROUND_SUMMARY_CHECK_INTERVAL, ROUND_STORE_LOAD_BATCH
+from models.TrainingRound import Metrics
+from services.round_ingestion import CLIENT_METRICS, RoundsUpdate, add_ingestion_listener, round_client_ids, rounds_version
+
+logger = logging.getLogger("app")
+
+METRICS = tuple(Metrics.model_fields) # Metric axis of the store: accuracy, precision, recall, f1, avg_loss
+
+# Vectorized analytics over the columns of the store, NaN marks a client that has no value for a round
+
+# Mean of the last window values at every position (ignoring missing values), NaN where the window has no value
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    present = ~np.isnan(values)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(present, values, 0.0))))
+    counts = np.concatenate(([0], np.cumsum(present)))
+    start = np.maximum(np.arange(1, len(values) + 1) - window, 0)
+    window_sums = sums[1:] - sums[start]
+    window_counts = counts[1:] - counts[start]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(window_counts > 0, window_sums / window_counts, np.nan)
+
+# Rank of every value, 1 for the highest, equal values share a rank and missing values have no rank (0)
+def rank_descending(values: np.ndarray) -> np.ndarray:
+    present = ~np.isnan(values)
+    ascending = np.sort(values[present])
+    ranks = np.zeros(len(values), dtype=np.int64)
+    ranks[present] = len(ascending) - np.searchsorted(ascending, values[present], side="right") + 1
+    return ranks
+
+# Positions of the k highest values, highest first (missing values are never returned)
+def best_k(values: np.ndarray, k: int) -> np.ndarray:
+    present = np.flatnonzero(~np.isnan(values))
+    k = min(k, len(present))
+    if k == 0:
+        return present
+    top = present[np.argpartition(values[present], len(present) - k)[len(present) - k:]]
+    return top[np.argsort(-values[top], kind="stable")]
+
+# Columnar copy of ClientMetrics in memory: values[round, client, metric] as a float64 array (NaN when missing),
+# with the round numbers (sorted) and client IDs as the labels of the first two axes
+# It is loaded on first use and then kept in step the same way as the round summary: rounds pushed to this worker after
+# the last stored round are appended (rows are preallocated, doubling when full), rounds that changed are rewritten in place,
+# anything else (replacements, rounds inserted in the middle, pushes handled by another worker) reloads it
+class RoundStore:
+    def __init__(self, check_interval: float = ROUND_SUMMARY_CHECK_INTERVAL, load_batch_size: int = ROUND_STORE_LOAD_BATCH):
+        self.check_interval = check_interval
+        self.load_batch_size = load_batch_size # ClientMetrics documents read per batch when the store is (re)loaded
+        self.version = None # Rounds version the store was built from, None until it is loaded
+        self._last_check = 0.0 # time.monotonic() of the last version check
+        self._lock = asyncio.Lock() # Only one coroutine checks/reloads at a time
+        self._reset()
+
+        # Counters exposed through stats()
+        self.reloads = 0
+        self.updates = 0
+
+    def _reset(self, rounds: int = 0, clients: int = 0):
+        self.count = 0 # Rows in use, the rest is preallocated space
+        self._round_numbers = np.empty(rounds, dtype=np.int64)
+        self._values = np.full((rounds, clients, len(METRICS)), np.nan)
+        self.client_ids = []
+        self.client_index = {}
+
+    # Round numbers and values of the rows in use (views, no copy)
+    @property
+    def round_numbers(self) -> np.ndarray:
+        return self._round_numbers[:self.count]
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._values[:self.count]
+
+    # Column of a client, adding it (and growing the client axis) if it is new
+    def _client_column(self, client_id: str) -> int:
+        if client_id not in self.client_index:
+            if len(self.client_ids) == self._values.shape[1]:
+                grown = np.full((self._values.shape[0], max(2 * len(self.client_ids), 8), len(METRICS)), np.nan)
+                grown[:, :len(self.client_ids)] = self._values
+                self._values = grown
+            self.client_index[client_id] = len(self.client_ids)
+            self.client_ids.append(client_id)
+        return self.client_index[client_id]
+
+    # Row of a new last round, growing the round axis if needed
+    def _append_row(self, round_number: int) -> int:
+        if self.count == len(self._round_numbers):
+            capacity = max(2 * self.count, 64)
+            self._round_numbers = np.resize(self._round_numbers, capacity)
+            grown = np.full((capacity, self._values.shape[1], len(METRICS)), np.nan)
+            grown[:self.count] = self._values[:self.count]
+            self._values = grown
+        self._round_numbers[self.count] = round_number
+        self.count += 1
+        return self.count - 1
+
+    # Row of a stored round, None if it is not stored
+    def row(self, round_number: int) -> int | None:
+        position = int(np.searchsorted(self.round_numbers, round_number))
+        return position if position < self.count and self.round_numbers[position] == round_number else None
+
+    # Write the metrics of one client for one round
+    def _set(self, row: int, client_id: str, metrics: dict):
+        metrics = metrics or {}
+        self._values[row, self._client_column(client_id)] = [metrics.get(name, np.nan) for name in METRICS]
+
+    # Build the arrays from ClientMetrics, sized up front from the distinct rounds and clients (read from the indexes)
+    # and filled batch by batch from the cursor, so only one batch of documents is held in memory next to the arrays
+    async def _reload(self, db, version):
+        collection = db[CLIENT_METRICS]
+        round_numbers = np.array(sorted(await collection.distinct("round_number")), dtype=np.int64)
+        client_ids = sorted(await collection.distinct("client_id"))
+        self._reset(len(round_numbers), len(client_ids))
+        self._round_numbers[:] = round_numbers
+        self.count = len(round_numbers)
+        self.client_ids = client_ids
+        self.client_index = {client_id: column for column, client_id in enumerate(client_ids)}
+
+        batch = []
+        cursor = collection.find({}, {"_id": 0, "client_id": 1, "round_number": 1, "metrics": 1}).batch_size(self.load_batch_size)
+        async for document in cursor:
+            batch.append(document)
+            if len(batch) >= self.load_batch_size:
+                self._fill(batch)
+                batch.clear()
+        self._fill(batch)
+        self.version = version
+        self.reloads += 1
+        logger.info(f"Round store loaded: {self.count} rounds x {len(self.client_ids)} clients ({self.nbytes() / 1024 / 1024:.1f} MB, version {version})")
+
+    # Write a batch of ClientMetrics documents into the arrays with one vectorized assignment
+    # Documents written after the rounds and clients were listed are skipped, their push bumped the version so the next get() reloads
+    def _fill(self, documents: list[dict]):
+        if not documents:
+            return
+        rows = np.searchsorted(self.round_numbers, [document["round_number"] for document in documents])
+        columns = np.array([self.client_index.get(document["client_id"], -1) for document in documents])
+        known = (rows < self.count) & (columns >= 0)
+        known[known] = self.round_numbers[rows[known]] == np.array([document["round_number"] for document in documents])[known]
+        values = np.array([[(document.get("metrics") or {}).get(name, np.nan) for name in METRICS] for document in documents], dtype=np.float64)
+        self._values[rows[known], columns[known]] = values[known]
+
+    # Returns the store, loading it on first use and reloading it when the rounds changed since it was built
+    async def get(self, db=None):
+        db = db if db is not None else mongodb.db
+        if self.version is not None and time.monotonic() - self._last_check < self.check_interval:
+            return self
+        async with self._lock:
+            if self.version is not None and time.monotonic() - self._last_check < self.check_interval:
+                return self # Checked by another coroutine while waiting for the lock
+            version, _ = await rounds_version(db)
+            self._last_check = time.monotonic()
+            if version != self.version:
+                await self._reload(db, version)
+            return self
+
+    # Ingestion listener, new last rounds are appended and changed rounds rewritten, anything else needs a reload
+    def apply(self, update: RoundsUpdate):
+        if self.version is None:
+            return # Not loaded yet (or already waiting for a reload)
+        last = self.round_numbers[-1] if self.count else None
+        new_rounds = sorted(document["round_number"] for document in update.delta if self.row(document["round_number"]) is None)
+        if update.mode == "replace" or update.version != self.version + 1 or (new_rounds and last is not None and new_rounds[0] < last):
+            self.version = None # Reloaded by the next get()
+            return
+        for document in sorted(update.delta, key=lambda document: document["round_number"]):
+            row = self.row(document["round_number"])
+            if row is None:
+                row = self._append_row(document["round_number"])
+            else:
+                self._values[row] = np.nan # Clients that left a changed round have no value anymore
+            for client_id in round_client_ids(document):
+                self._set(row, client_id, document[client_id])
+        self.version = update.version
+        self.updates += 1
+
+    # Column of a client in values, KeyError if unknown
+    def column(self, client_id: str) -> int:
+        return self.client_index[client_id]
+
+    # Memory held by the arrays, including the preallocated rows
+    def nbytes(self) -> int:
+        return self._values.nbytes + self._round_numbers.nbytes
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "rounds": self.count,
+            "clients": len(self.client_ids),
+            "metrics": list(METRICS),
+            "memory_mb": round(self.nbytes() / 1024 / 1024, 2),
+            "reloads": self.reloads,
+            "updates": self.updates,
+        }
+
+round_store = RoundStore()
+add_ingestion_listener(round_store.apply)
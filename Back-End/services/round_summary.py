@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import time
+
+from config.db import mongodb
+from config.settings import ROUND_SUMMARY_CHECK_INTERVAL
+from services.round_ingestion import (
+    CLIENT_METRICS, RoundsUpdate, add_ingestion_listener, client_metrics_documents, rounds_version
+)
+
+logger = logging.getLogger("app")
+
+# Sort key for client IDs: Global first, then client_<n> by number, then anything else by name
+def client_sort_key(client_id: str):
+    if client_id == "Global":
+        return (0, 0, "")
+    suffix = client_id.removeprefix("client_")
+    return (1, int(suffix), "") if suffix.isdigit() else (2, 0, client_id)
+
+# F1 score of a ClientMetrics document, missing metrics count as the lowest score
+def f1_score(client_metrics: dict) -> float:
+    return (client_metrics.get("metrics") or {}).get("f1", float("-inf"))
+
+# Summary of the rounds kept in memory, so the dashboard is served without any aggregation:
+# best Global round, best and latest round of every client, the client list and the number of rounds
+# New rounds pushed to this worker are added incrementally (see RoundsUpdate), anything else (changed or removed rounds,
+# or pushes handled by another worker, noticed through the rounds version at most once per check_interval) reloads it
+# from ClientMetrics
+class RoundSummary:
+    def __init__(self, check_interval: float = ROUND_SUMMARY_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self.version = None # Rounds version the summary was built from, None until it is loaded
+        self.updated_at = None # When that version was pushed
+        self._last_check = 0.0 # time.monotonic() of the last version check
+        self._lock = asyncio.Lock() # Only one coroutine checks/reloads at a time
+        self._reset()
+
+        # Counters exposed through stats()
+        self.reloads = 0 # Full reloads from ClientMetrics
+        self.updates = 0 # Pushes applied incrementally
+
+    def _reset(self):
+        self.clients = {} # client_id -> {"best": ClientMetrics document, "latest": ClientMetrics document}
+        self.round_numbers = set()
+
+    # Add one ClientMetrics document to the summary
+    def _add(self, client_metrics: dict):
+        self.round_numbers.add(client_metrics["round_number"])
+        client = self.clients.setdefault(client_metrics["client_id"], {"best": client_metrics, "latest": client_metrics})
+        if f1_score(client_metrics) > f1_score(client["best"]):
+            client["best"] = client_metrics
+        if client_metrics["round_number"] > client["latest"]["round_number"]:
+            client["latest"] = client_metrics
+
+    async def _reload(self, db, version, updated_at):
+        self._reset()
+        # Sorted by round so that ties on the best F1 keep the earliest round
+        async for client_metrics in db[CLIENT_METRICS].find({}, {"_id": 0}).sort([("client_id", 1), ("round_number", 1)]):
+            self._add(client_metrics)
+        self.version, self.updated_at = version, updated_at
+        self.reloads += 1
+        logger.info(f"Round summary loaded: {len(self.round_numbers)} rounds, {len(self.clients)} clients (version {version})")
+
+    # Returns the summary, reloading it when the rounds changed since it was built
+    async def get(self, db=None):
+        db = db if db is not None else mongodb.db
+        if self.version is not None and time.monotonic() - self._last_check < self.check_interval:
+            return self
+        async with self._lock:
+            if self.version is not None and time.monotonic() - self._last_check < self.check_interval:
+                return self # Checked by another coroutine while waiting for the lock
+            version, updated_at = await rounds_version(db)
+            self._last_check = time.monotonic()
+            if version != self.version:
+                await self._reload(db, version, updated_at)
+            return self
+
+    # Ingestion listener, new rounds are added in place, changed or removed rounds need a reload
+    def apply(self, update: RoundsUpdate):
+        if self.version is None:
+            return # Not loaded yet, the first get() loads everything
+        if update.mode == "replace" or update.version != self.version + 1 or any(document["round_number"] in self.round_numbers for document in update.delta):
+            self.version = None # Reloaded by the next get()
+            return
+        for document in update.delta:
+            for client_metrics in client_metrics_documents(document):
+                self._add(client_metrics)
+        self.version, self.updated_at = update.version, update.updated_at
+        self.updates += 1
+
+    # Version part of the ETags of the responses built from the summary (see services/http_cache.py)
+    @property
+    def version_tag(self) -> str:
+        return f"rounds-{self.version}"
+
+    # Client IDs, Global first and then the clients in numeric order
+    def client_ids(self) -> list[str]:
+        return sorted(self.clients, key=client_sort_key)
+
+    # Best Global round, in the format of /best-f1-global
+    def best_global(self) -> dict | None:
+        best = self.clients.get("Global", {}).get("best")
+        if not best:
+            return None
+        return {"round": best["round"], "created_at": best.get("created_at"), "metrics": best["metrics"], "f1": best["metrics"].get("f1")}
+
+    # Whole summary, for /summary
+    def as_dict(self) -> dict:
+        return {
+            "round_count": len(self.round_numbers),
+            "best_global": self.best_global(),
+            "clients": {
+                client_id: {
+                    "best": {"round_id": self.clients[client_id]["best"]["round"], "metrics": self.clients[client_id]["best"]["metrics"]},
+                    "latest": {"round_id": self.clients[client_id]["latest"]["round"], "metrics": self.clients[client_id]["latest"]["metrics"]},
+                }
+                for client_id in self.client_ids()
+            },
+        }
+
+    # Reload/update counters and the version being served
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "rounds": len(self.round_numbers),
+            "clients": len(self.clients),
+            "reloads": self.reloads,
+            "updates": self.updates,
+        }
+
+round_summary = RoundSummary()
+add_ingestion_listener(round_summary.apply)
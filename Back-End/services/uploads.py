@@ -0,0 +1,72 @@
+import os
+import tarfile
+import zipfile
+
+from config.settings import MAX_IMAGE_BYTES, BATCH_UPLOAD_MAX_FILES
+
+# File extensions accepted as images inside an archive
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff"}
+
+# Archive types accepted by /predict/batch
+ARCHIVE_EXTENSIONS = (".zip", ".tar", ".tar.gz", ".tgz")
+
+# Raised when an upload or an archive member cannot be used (eg. too large or too many files)
+class UploadError(ValueError):
+    pass
+
+def is_archive(filename: str) -> bool:
+    return (filename or "").lower().endswith(ARCHIVE_EXTENSIONS)
+
+def is_image_name(filename: str) -> bool:
+    name = os.path.basename(filename)
+    return not name.startswith(".") and os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+
+# Read a file object up to max_bytes, raising UploadError when it is larger
+def read_limited(file, max_bytes: int = MAX_IMAGE_BYTES) -> bytes:
+    data = file.read(max_bytes + 1)
+    if len(data) > max_bytes:
+        raise UploadError(f"Image is larger than {max_bytes} bytes")
+    return data
+
+# Yield (filename, bytes or UploadError) for every image in a zip or tar archive, one member at a time
+def _iter_archive(upload):
+    upload.file.seek(0)
+    if upload.filename.lower().endswith(".zip"):
+        with zipfile.ZipFile(upload.file) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or not is_image_name(info.filename) or info.filename.startswith("__MACOSX/"):
+                    continue
+                if info.file_size > MAX_IMAGE_BYTES: # Checked from the header, before decompressing
+                    yield info.filename, UploadError(f"Image is larger than {MAX_IMAGE_BYTES} bytes")
+                    continue
+                with archive.open(info) as member:
+                    yield info.filename, read_limited(member)
+    else:
+        with tarfile.open(fileobj=upload.file, mode="r:*") as archive:
+            for member in archive:
+                if not member.isfile() or not is_image_name(member.name):
+                    continue
+                if member.size > MAX_IMAGE_BYTES:
+                    yield member.name, UploadError(f"Image is larger than {MAX_IMAGE_BYTES} bytes")
+                    continue
+                yield member.name, read_limited(archive.extractfile(member))
+
+# Yield (filename, bytes or UploadError) for every image in the uploaded files
+# A single zip/tar upload is expanded lazily, so only one image is held in memory at a time
+def iter_upload_images(uploads, max_files: int = BATCH_UPLOAD_MAX_FILES):
+    if len(uploads) == 1 and is_archive(uploads[0].filename):
+        items = _iter_archive(uploads[0])
+    else:
+        items = ((upload.filename, _read_upload(upload)) for upload in uploads)
+
+    for count, item in enumerate(items):
+        if count >= max_files:
+            raise UploadError(f"Too many images, the limit is {max_files}")
+        yield item
+
+def _read_upload(upload):
+    upload.file.seek(0)
+    try:
+        return read_limited(upload.file)
+    except UploadError as e:
+        return e
@@ -1,5 +1,11 @@
 import asyncio
+import os
 import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from fastapi.encoders import jsonable_encoder
+from config.indexes import ensure_indexes
+from models.TrainingRound import TrainingRound
+import services.round_ingestion as round_ingestion
 
 @pytest.fixture(scope="session")
 def event_loop():
@@ -8,4 +14,32 @@ def event_loop():
     except RuntimeError:
         loop = asyncio.new_event_loop()
     yield loop
-    loop.close()
\ No newline at end of file
+    loop.close()
+
+# Fixture to get an empty scratch database with the app's indexes, dropped after each test
+@pytest.fixture
+async def scratch_db():
+    client = AsyncIOMotorClient(os.getenv("MONGO_PUBLIC_URL"))
+    db = client[f"{os.getenv('DB_NAME', 'dashboard')}_test"]
+    await client.drop_database(db.name)
+    await ensure_indexes(db)
+    yield db
+    await client.drop_database(db.name)
+    client.close()
+
+# Fixture to build rounds as the FL server sends them, after validation, eg. training_round(3, 0.8, 0.4, client_10=0.1)
+# The values are F1 scores: Global, client_1 (half of Global when not given) and any other client passed by name
+@pytest.fixture
+def training_round():
+    def build(number: int, global_f1: float = 0.5, client_f1: float = None, **other_clients: float) -> dict:
+        clients = {"client_1": global_f1 / 2 if client_f1 is None else client_f1, **other_clients}
+        return jsonable_encoder(TrainingRound(round=str(number), Global={"f1": global_f1}, **{client_id: {"f1": f1} for client_id, f1 in clients.items()}))
+    return build
+
+# Fixture to make a callback the only ingestion listener during a test, eg. ingestion_listener(summary.apply),
+# so the objects under test are updated by the pushes without touching the shared instances of the app
+@pytest.fixture
+def ingestion_listener(monkeypatch):
+    def listen(callback):
+        monkeypatch.setattr(round_ingestion, "ingestion_listeners", [callback])
+    return listen
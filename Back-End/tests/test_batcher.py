@@ -0,0 +1,72 @@
+import asyncio
+import pytest
+import torch
+import torch.nn as nn
+import logging
+from services.batcher import InferenceBatcher
+from services.model_registry import LoadedModel
+
+logger = logging.getLogger(__name__)
+
+# Small model that records the batch size of every forward pass
+class CountingModel(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.linear = nn.Linear(4, 3)
+        self.batch_sizes = []
+
+    def forward(self, x):
+        self.batch_sizes.append(x.size(0))
+        return self.linear(x)
+
+# Registry stand-in that always serves the same model
+class StaticRegistry:
+    def __init__(self, model):
+        self.loaded = LoadedModel(model, "v1", "2025-01-01")
+
+    async def get(self):
+        return self.loaded
+
+# This test checks that concurrent requests share one forward pass and each gets its own row back.
+@pytest.mark.asyncio
+async def test_batcher_groups_concurrent_requests():
+    model = CountingModel().eval()
+    batcher = InferenceBatcher(StaticRegistry(model), max_batch_size=8, max_wait_ms=50)
+    images = [torch.randn(4) for _ in range(5)]
+
+    results = await asyncio.gather(*(batcher.submit(image) for image in images))
+    await batcher.close()
+    logger.info(f"Forward passes: {model.batch_sizes}")
+
+    assert model.batch_sizes == [5]
+    for image, (row, loaded) in zip(images, results):
+        expected = torch.softmax(model.linear(image.unsqueeze(0)), dim=1)[0]
+        assert torch.allclose(torch.tensor(row), expected, atol=1e-6)
+        assert loaded.file_id == "v1"
+
+# This test checks that a batch never grows past max_batch_size.
+@pytest.mark.asyncio
+async def test_batcher_respects_max_batch_size():
+    model = CountingModel().eval()
+    batcher = InferenceBatcher(StaticRegistry(model), max_batch_size=4, max_wait_ms=50)
+
+    await asyncio.gather(*(batcher.submit(torch.randn(4)) for _ in range(10)))
+    await batcher.close()
+    logger.info(f"Forward passes: {model.batch_sizes}")
+
+    assert max(model.batch_sizes) <= 4
+    assert sum(model.batch_sizes) == 10
+    assert batcher.stats()["images"] == 10
+
+# This test checks that a failing forward pass is reported to every waiting request.
+@pytest.mark.asyncio
+async def test_batcher_propagates_errors():
+    class BrokenRegistry:
+        async def get(self):
+            raise ValueError("Model not found in database.")
+
+    batcher = InferenceBatcher(BrokenRegistry(), max_batch_size=4, max_wait_ms=10)
+    results = await asyncio.gather(*(batcher.submit(torch.randn(4)) for _ in range(2)), return_exceptions=True)
+    await batcher.close()
+
+    assert all(isinstance(result, ValueError) for result in results)
@@ -0,0 +1,68 @@
+import json
+import zlib
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.testclient import TestClient
+from services.compression import CompressionMiddleware, Compressor, choose_encoding, encoded_etag
+
+ROUNDS = [{"round": str(number), "Global": {"accuracy": 0.9, "precision": 0.8, "recall": 0.7, "f1": 0.75, "avg_loss": 0.3}} for number in range(200)]
+
+# Fixture to get a client of a small app behind the middleware
+@pytest.fixture(scope="module")
+def client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+    @app.get("/rounds")
+    async def rounds():
+        return JSONResponse(ROUNDS, headers={"ETag": '"rounds-1"'})
+
+    @app.get("/small")
+    async def small():
+        return {"f1": 0.75}
+
+    @app.get("/stream")
+    async def stream():
+        return StreamingResponse((json.dumps(round) + "\n" for round in ROUNDS[:3]), media_type="application/x-ndjson")
+
+    @app.get("/events")
+    async def events():
+        return StreamingResponse(iter(["data: {}\n\n"] * 100), media_type="text/event-stream")
+
+    return TestClient(app)
+
+# This test checks the content coding picked for an Accept-Encoding header (br is only offered with the brotli package).
+def test_choose_encoding():
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0, deflate") is None
+    assert choose_encoding("*") in ("br", "gzip")
+    assert choose_encoding("") is None
+    assert encoded_etag('"rounds-1"', "gzip") == '"rounds-1-gzip"'
+    assert encoded_etag('W/"rounds-1"', "br") == 'W/"rounds-1-br"'
+
+# This test checks that large JSON responses are gzipped with their own ETag and small ones are sent as they are.
+def test_json_compressed(client):
+    response = client.get("/rounds", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == '"rounds-1-gzip"'
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) * 10 < len(json.dumps(ROUNDS))
+    assert response.json() == ROUNDS
+    assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/rounds", headers={"Accept-Encoding": "identity"}).headers
+
+# This test checks that each chunk of a streamed response can be decompressed as soon as it arrives,
+# and that Server-Sent Events are not compressed.
+def test_streams(client):
+    compressor, decompressor = Compressor("gzip", 6, 5), zlib.decompressobj(31)
+    assert decompressor.decompress(compressor.compress(b"line 1\n", final=False)) == b"line 1\n"
+    assert decompressor.decompress(compressor.compress(b"line 2\n", final=True)) == b"line 2\n"
+
+    with client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as response:
+        assert response.headers["content-encoding"] == "gzip"
+        decompressor = zlib.decompressobj(31)
+        chunks = [decompressor.decompress(chunk) for chunk in response.iter_raw()]
+    assert [json.loads(line) for line in b"".join(chunks).splitlines()] == ROUNDS[:3]
+    assert "content-encoding" not in client.get("/events", headers={"Accept-Encoding": "gzip"}).headers
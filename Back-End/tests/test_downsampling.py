@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+import logging
+from services.downsampling import lttb, minmax, downsample
+
+logger = logging.getLogger(__name__)
+
+# Noisy training curve with one spike, like the F1 score of a client over many rounds
+@pytest.fixture
+def series():
+    rounds = np.arange(1, 10001)
+    values = np.sin(rounds / 300) + np.random.default_rng(0).normal(0, 0.1, len(rounds))
+    values[5000] = 10.0
+    return rounds, values
+
+# This test checks that LTTB returns the requested number of points, in order, with the first, last and spike points kept.
+def test_lttb(series):
+    rounds, values = series
+    kept = lttb(rounds, values, 500)
+
+    assert len(kept) == 500
+    assert np.all(np.diff(kept) > 0)
+    assert kept[0] == 0 and kept[-1] == len(rounds) - 1
+    assert 5000 in kept
+
+# This test checks that min/max bucketing keeps the lowest and highest value of the whole series and no more points than requested.
+def test_minmax(series):
+    rounds, values = series
+    kept = minmax(rounds, values, 500)
+
+    assert len(kept) <= 500
+    assert np.all(np.diff(kept) > 0)
+    assert np.argmax(values) in kept and np.argmin(values) in kept
+
+# This test checks that short series are returned as they are and that unknown methods are rejected.
+def test_short_series_and_unknown_method():
+    rounds, values = np.arange(5), np.arange(5, dtype=float)
+
+    assert downsample(rounds, values, 10, "lttb").tolist() == [0, 1, 2, 3, 4]
+    assert downsample(rounds, values, 10, "minmax").tolist() == [0, 1, 2, 3, 4]
+    with pytest.raises(ValueError):
+        downsample(rounds, values, 3, "average")
@@ -0,0 +1,69 @@
+import pytest
+import json
+import logging
+from services.round_ingestion import ingest_rounds
+from services.events import EventBroadcaster, Subscriber, TooManySubscribers, KEEPALIVE, resync_event
+
+logger = logging.getLogger(__name__)
+
+# Split one Server-Sent Event into its fields, with the data decoded
+def parse_event(message: bytes) -> dict:
+    fields = dict(line.split(": ", 1) for line in message.decode().strip().split("\n"))
+    fields["data"] = json.loads(fields["data"])
+    return fields
+
+# Fixture to get a broadcaster with small limits, so that overflows and the subscriber cap are easy to reach
+@pytest.fixture
+def broadcaster(ingestion_listener):
+    broadcaster = EventBroadcaster(queue_size=2, max_subscribers=2, check_interval=60)
+    ingestion_listener(broadcaster.apply)
+    return broadcaster
+
+# This test checks that a subscriber whose buffer is full gets a single resync instead of the events it missed.
+def test_slow_subscriber_resyncs():
+    subscriber = Subscriber(2)
+    for version in (1, 2, 3):
+        subscriber.put(f"event {version}".encode(), version)
+
+    assert subscriber.queue.qsize() == 1
+    assert subscriber.overflows == 1
+    assert parse_event(subscriber.queue.get_nowait()) == {"id": "3", "event": "resync", "data": {"version": 3}}
+
+# This test checks that a push is sent to every open stream with only the changed rounds, and that a replacement sends a resync.
+@pytest.mark.asyncio
+async def test_push_sent_to_subscribers(scratch_db, broadcaster, training_round):
+    first, second = broadcaster.subscribe(), broadcaster.subscribe()
+    with pytest.raises(TooManySubscribers):
+        broadcaster.subscribe()
+
+    await ingest_rounds(scratch_db, [training_round(1, 0.5), training_round(2, 0.6)])
+    await ingest_rounds(scratch_db, [training_round(1, 0.5), training_round(2, 0.7)])
+    events = [parse_event(first.queue.get_nowait()) for _ in range(2)]
+    logger.info(f"Events: {events}")
+
+    assert [event["event"] for event in events] == ["rounds", "rounds"]
+    assert [event["id"] for event in events] == ["1", "2"]
+    assert [round["round"] for round in events[1]["data"]["rounds"]] == ["2"]
+    assert "round_number" not in events[1]["data"]["rounds"][0]
+    assert second.queue.qsize() == 2
+
+    await ingest_rounds(scratch_db, [training_round(1, 0.5)], mode="replace")
+    assert parse_event(first.queue.get_nowait())["event"] == "resync"
+
+    broadcaster.unsubscribe(first)
+    broadcaster.unsubscribe(second)
+    assert broadcaster.stats()["subscribers"] == 0
+
+# This test checks the stream body: keepalive comments while idle, the events as they arrive, and unsubscribing when it is closed.
+@pytest.mark.asyncio
+async def test_stream(broadcaster):
+    subscriber = broadcaster.subscribe()
+    stream = broadcaster.stream(subscriber, keepalive=0.01)
+
+    assert await anext(stream) == KEEPALIVE
+    assert await anext(stream) == KEEPALIVE
+    subscriber.put(resync_event(4))
+    assert parse_event(await anext(stream))["event"] == "resync"
+
+    await stream.aclose()
+    assert subscriber not in broadcaster.subscribers
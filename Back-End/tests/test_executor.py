@@ -0,0 +1,41 @@
+import asyncio
+import threading
+import pytest
+import logging
+from services.executor import BoundedExecutor, ExecutorSaturated
+
+logger = logging.getLogger(__name__)
+
+# This test checks that work runs on the pool threads and not on the event loop thread.
+@pytest.mark.asyncio
+async def test_executor_runs_off_event_loop():
+    executor = BoundedExecutor("test", max_workers=1, max_pending=2)
+    worker_thread = await executor.submit(threading.get_ident)
+    executor.shutdown()
+
+    assert worker_thread != threading.get_ident()
+    assert executor.stats()["completed"] == 1
+
+# This test checks that requests beyond max_pending are rejected instead of queued.
+@pytest.mark.asyncio
+async def test_executor_rejects_when_saturated():
+    executor = BoundedExecutor("test", max_workers=1, max_pending=2)
+    release = threading.Event()
+
+    # Fill both slots with calls that block until released
+    running = [asyncio.create_task(executor.submit(release.wait)) for _ in range(2)]
+    await asyncio.sleep(0.05)
+
+    with pytest.raises(ExecutorSaturated):
+        await executor.submit(release.wait)
+
+    release.set()
+    await asyncio.gather(*running)
+    logger.info(f"Executor stats: {executor.stats()}")
+
+    assert executor.stats()["rejected"] == 1
+    assert executor.stats()["pending"] == 0
+
+    # A slot is free again once the earlier calls finished
+    assert await executor.submit(lambda: "ok") == "ok"
+    executor.shutdown()
@@ -0,0 +1,67 @@
+import pytest
+from config.db import mongodb, open_connection, close_connection
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Fixture to initialize the MongoDB connection (open_connection also creates the indexes).
+@pytest.fixture(scope="session")
+async def mongodb_client():
+    logger.info("Opening MongoDB connection for test session.")
+    await open_connection()
+    yield mongodb
+    logger.info("Closing MongoDB connection for test session.")
+    await close_connection()
+
+# Collect the stages of the winning plan of an explain() result (the plan is nested through inputStage/inputStages)
+def plan_stages(explain: dict) -> list[dict]:
+    stages = []
+    pending = [explain["queryPlanner"]["winningPlan"]]
+    while pending:
+        stage = pending.pop()
+        stage = stage.get("queryPlan", stage) # Plans run by the slot based engine are wrapped in queryPlan
+        stages.append(stage)
+        pending.extend(stage.get("inputStages", []))
+        if "inputStage" in stage:
+            pending.append(stage["inputStage"])
+    return stages
+
+# Name of the index used by a query, or None when the collection is scanned
+def used_index(explain: dict):
+    for stage in plan_stages(explain):
+        if stage.get("stage") == "COLLSCAN":
+            return None
+        if stage.get("stage") in ("IXSCAN", "EXPRESS_IXSCAN"):
+            return stage.get("indexName")
+    return None
+
+# This test checks that the indexes exist after open_connection, including the TTL index on Sessions.expires.
+@pytest.mark.asyncio
+async def test_indexes_created(mongodb_client):
+    sessions_indexes = await mongodb.db["Sessions"].index_information()
+    logger.info(f"Sessions indexes: {sessions_indexes}")
+
+    assert sessions_indexes["token_unique"]["unique"] is True
+    assert "user_id" in sessions_indexes
+    assert sessions_indexes["expires_ttl"]["expireAfterSeconds"] == 0
+    assert (await mongodb.db["Users"].index_information())["username_unique"]["unique"] is True
+    assert "model_name_latest" in await mongodb.db["models"].index_information()
+    assert (await mongodb.db["Rounds"].index_information())["round_number_unique"]["unique"] is True
+    assert (await mongodb.db["ClientMetrics"].index_information())["client_round_unique"]["unique"] is True
+
+# This test checks that the lookups made by the routes use the indexes instead of scanning the collections.
+@pytest.mark.asyncio
+async def test_queries_use_indexes(mongodb_client):
+    db = mongodb.db
+    explains = {
+        "token_unique": await db["Sessions"].find({"token": "not-a-token"}).explain(),
+        "user_id": await db["Sessions"].find({"user_id": "not-a-user"}).explain(),
+        "username_unique": await db["Users"].find({"username": "nobody@example.com"}).explain(),
+        "model_name_latest": await db["models"].find({"model_name": "my_model"}).sort("_id", -1).limit(1).explain(),
+        "round_number_unique": await db["Rounds"].find({"round_number": {"$gt": 0}}).sort("round_number", 1).explain(),
+        "client_round_unique": await db["ClientMetrics"].find({"client_id": "Global"}).sort("round_number", -1).explain(),
+    }
+
+    for index_name, explain in explains.items():
+        logger.info(f"Index used for {index_name}: {used_index(explain)}")
+        assert used_index(explain) == index_name
@@ -0,0 +1,30 @@
+import time
+import logging
+from services.lru_cache import LRUCache
+from services.prediction_cache import content_hash
+
+logger = logging.getLogger(__name__)
+
+# This test checks that the least recently used entry is evicted once the cache is full.
+def test_cache_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2, ttl=0)
+    cache.put(("a", "v1"), {"prediction": "class_0"})
+    cache.put(("b", "v1"), {"prediction": "class_1"})
+    cache.get(("a", "v1")) # "a" is now the most recently used
+    cache.put(("c", "v1"), {"prediction": "class_2"})
+    logger.info(f"Cache stats: {cache.stats()}")
+
+    assert cache.get(("b", "v1")) is None
+    assert cache.get(("a", "v1")) == {"prediction": "class_0"}
+    assert cache.stats()["entries"] == 2
+
+# This test checks that entries expire after the TTL and that keys include the model version.
+def test_cache_ttl_and_model_version():
+    cache = LRUCache(max_entries=10, ttl=0.05)
+    key = content_hash(b"image bytes")
+    cache.put((key, "v1"), {"prediction": "class_0"})
+
+    assert cache.get((key, "v2")) is None # Same image, different model
+    assert cache.get((key, "v1")) is not None
+    time.sleep(0.1)
+    assert cache.get((key, "v1")) is None
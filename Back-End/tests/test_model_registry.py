@@ -0,0 +1,160 @@
+import io
+import pytest
+import torch
+import logging
+from datetime import datetime, timezone
+from config.db import mongodb
+from models.ClientModel import ClientModel
+import services.model_registry as model_registry_module
+from services.model_registry import ModelRegistry
+
+logger = logging.getLogger(__name__)
+
+# Minimal stand-ins for the collections and GridFS bucket used by the registry
+# They count the queries so the tests can check what hit the database
+class FakeCollection:
+    def __init__(self, find_one_result):
+        self.find_one_result = find_one_result
+        self.queries = 0
+
+    async def find_one(self, *args, **kwargs):
+        self.queries += 1
+        return self.find_one_result
+
+class FakeGridOut:
+    def __init__(self, data):
+        self.data = data
+
+    async def read(self):
+        return self.data
+
+class FakeBucket:
+    def __init__(self, files):
+        self.files = files
+        self.downloads = 0
+
+    async def open_download_stream(self, file_id):
+        self.downloads += 1
+        return FakeGridOut(self.files[file_id])
+
+class FakeFs:
+    def __init__(self):
+        self.files = FakeCollection({"uploadDate": datetime(2025, 1, 1, tzinfo=timezone.utc)})
+
+class FakeDb:
+    def __init__(self, file_id):
+        self.models = FakeCollection({"file_id": file_id})
+        self.fs = FakeFs()
+
+# Serialize a freshly initialized model the same way the FL server stores it in GridFS
+def model_bytes():
+    buffer = io.BytesIO()
+    torch.save(ClientModel().state_dict(), buffer)
+    return buffer.getvalue()
+
+# Fixture that points the registry at the fake database and bucket
+@pytest.fixture
+def fake_storage(monkeypatch):
+    data = model_bytes()
+    bucket = FakeBucket({"v1": data, "v2": data})
+    db = FakeDb("v1")
+    monkeypatch.setattr(model_registry_module, "get_gridfs_bucket", lambda: bucket)
+    previous_db = mongodb._db
+    mongodb.set_db(db)
+    yield db, bucket
+    mongodb.set_db(previous_db)
+
+# This test checks that the model is downloaded once and then served from memory.
+@pytest.mark.asyncio
+async def test_registry_caches_model(fake_storage):
+    db, bucket = fake_storage
+    registry = ModelRegistry("my_model", check_interval=60)
+
+    first = await registry.get()
+    second = await registry.get()
+    logger.info(f"Registry stats: {registry.stats()}")
+
+    assert first is second
+    assert bucket.downloads == 1
+    assert db.models.queries == 1  # The second call did not even check the metadata
+    assert registry.stats()["hits"] == 1
+    assert registry.stats()["misses"] == 1
+
+# This test checks that a metadata check which finds the same file_id does not download the model again.
+@pytest.mark.asyncio
+async def test_registry_metadata_check_without_download(fake_storage):
+    db, bucket = fake_storage
+    registry = ModelRegistry("my_model", check_interval=0)
+
+    await registry.get()
+    await registry.get()
+
+    assert db.models.queries == 2
+    assert bucket.downloads == 1
+    assert registry.stats()["reloads"] == 0
+
+# This test checks that a newer upload is swapped in and counted as a reload.
+@pytest.mark.asyncio
+async def test_registry_hot_swaps_new_version(fake_storage):
+    db, bucket = fake_storage
+    registry = ModelRegistry("my_model", check_interval=60)
+
+    first = await registry.get()
+    db.models.find_one_result = {"file_id": "v2"}
+    registry.notify()  # Force a metadata check on the next call
+    second = await registry.get()
+    logger.info(f"Registry stats after reload: {registry.stats()}")
+
+    assert first.file_id == "v1"
+    assert second.file_id == "v2"
+    assert second.model is not first.model
+    assert registry.stats()["reloads"] == 1
+
+# This test checks that a pushed file_id is loaded without querying the models collection.
+@pytest.mark.asyncio
+async def test_registry_pushed_version(fake_storage):
+    db, bucket = fake_storage
+    registry = ModelRegistry("my_model", check_interval=60)
+
+    await registry.get()
+    registry.notify("v2")
+    loaded = await registry.get()
+
+    assert loaded.file_id == "v2"
+    assert db.models.queries == 1
+
+# Collection whose queries fail, like a database that is briefly unreachable
+class FailingCollection:
+    async def find_one(self, *args, **kwargs):
+        raise ConnectionError("database unreachable")
+
+# This test checks that the loaded model is still served when the version check or the new version fails,
+# and that the error is only raised when no model has been loaded yet.
+@pytest.mark.asyncio
+async def test_registry_serves_current_model_on_failure(fake_storage):
+    db, bucket = fake_storage
+    registry = ModelRegistry("my_model", check_interval=60)
+
+    first = await registry.get()
+    db.models = FailingCollection()
+    registry.notify()
+    assert await registry.get() is first
+
+    registry.notify("missing") # Not in the bucket, like an upload that cannot be loaded
+    assert await registry.get() is first
+    assert registry.stats()["failures"] == 2
+
+    with pytest.raises(ConnectionError):
+        await ModelRegistry("my_model", check_interval=60).get()
+
+# This test checks that stats() reports the backend that is served, fp32 when the configured one could not be built.
+@pytest.mark.asyncio
+async def test_registry_reports_served_backend(fake_storage):
+    registry = ModelRegistry("my_model", check_interval=60, backend="fp16")
+
+    assert registry.stats()["backend"] is None
+    loaded = await registry.get()
+
+    assert loaded.backend == "fp32"
+    assert registry.stats()["backend"] == "fp32"
+    assert registry.stats()["configured_backend"] == "fp16"
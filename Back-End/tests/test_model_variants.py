@@ -0,0 +1,29 @@
+import pytest
+import torch
+import logging
+from models.ClientModel import ClientModel
+from services.model_variants import MODEL_VARIANTS, PARITY_MAX_PROB_DIFF, build_variant, build_checked_variant, check_parity
+
+logger = logging.getLogger(__name__)
+
+# This test checks that every inference backend stays within the parity bound of the fp32 model on the fixed inputs.
+@pytest.mark.parametrize("variant", MODEL_VARIANTS)
+def test_variant_parity(variant):
+    torch.manual_seed(0)
+    reference = ClientModel().eval()
+    candidate = build_variant(reference, variant)
+    parity = check_parity(reference, candidate)
+    logger.info(f"Parity of {variant}: {parity}")
+
+    assert parity["max_prob_diff"] <= PARITY_MAX_PROB_DIFF
+    model, backend = build_checked_variant(reference, variant)
+    assert backend == variant
+    assert model is not reference or variant == "fp32"
+
+# This test checks that an unknown backend falls back to the fp32 model instead of failing to load.
+def test_unknown_variant_falls_back_to_fp32():
+    reference = ClientModel().eval()
+
+    with pytest.raises(ValueError):
+        build_variant(reference, "fp16")
+    assert build_checked_variant(reference, "fp16") == (reference, "fp32")
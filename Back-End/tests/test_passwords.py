@@ -0,0 +1,43 @@
+import asyncio
+import pytest
+import logging
+from passlib.context import CryptContext
+from services.passwords import hash_password, verify_password, needs_rehash, password_executor
+
+logger = logging.getLogger(__name__)
+
+# This test checks that a password hashed on the worker pool verifies and that a wrong password does not.
+@pytest.mark.asyncio
+async def test_hash_and_verify():
+    hashed = await hash_password("correct horse")
+
+    assert hashed.startswith("$argon2id$")
+    assert await verify_password("correct horse", hashed)
+    assert not await verify_password("wrong horse", hashed)
+    assert not needs_rehash(hashed)
+
+# This test checks that hashes made with other Argon2 parameters are flagged for a rehash on login.
+def test_needs_rehash_with_other_parameters():
+    old_context = CryptContext(schemes=["argon2"], argon2__time_cost=1, argon2__memory_cost=8192, argon2__parallelism=1)
+    old_hash = old_context.hash("correct horse")
+    logger.info(f"Old hash: {old_hash}")
+
+    assert needs_rehash(old_hash)
+
+# This test checks that the event loop keeps running while passwords are being hashed.
+@pytest.mark.asyncio
+async def test_hashing_does_not_block_event_loop():
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.001)
+
+    ticker_task = asyncio.create_task(ticker())
+    await asyncio.gather(*(hash_password("correct horse") for _ in range(4)))
+    ticker_task.cancel()
+    logger.info(f"Event loop ticks while hashing: {ticks}, pool stats: {password_executor.stats()}")
+
+    assert ticks > 4
@@ -0,0 +1,46 @@
+import io
+import pytest
+import torch
+import logging
+from PIL import Image
+from benchmarks.bench_preprocessing import legacy_preprocess, synthetic_image
+from services.preprocessing import preprocess_image, ImageTooLarge
+
+logger = logging.getLogger(__name__)
+
+# This test checks that the fast path gives the same tensor as the original transform for a PNG (no draft decoding).
+def test_preprocess_matches_transform_png():
+    data = synthetic_image(640, 480, "PNG")
+    expected, expected_size = legacy_preprocess(data)
+    tensor, size = preprocess_image(data)
+
+    assert tensor.shape == (3, 224, 224)
+    assert size == expected_size == (640, 480)
+    assert torch.allclose(tensor, expected, atol=1e-5)
+
+# This test checks that draft decoding of a large JPEG stays close to the full decode and keeps the original size.
+def test_preprocess_large_jpeg_draft():
+    data = synthetic_image(3000, 2000, "JPEG")
+    expected, _ = legacy_preprocess(data)
+    tensor, size = preprocess_image(data)
+    difference = (tensor - expected).abs()
+    logger.info(f"Mean difference: {difference.mean().item():.4f}, max difference: {difference.max().item():.4f}")
+
+    assert size == (3000, 2000)
+    assert difference.mean().item() < 0.02
+
+# This test checks the test image used by the end-to-end tests.
+def test_preprocess_test_image():
+    with open("tests/WBC-Benign-001_test.jpg", "rb") as f:
+        data = f.read()
+    tensor, _ = preprocess_image(data)
+
+    assert torch.allclose(tensor, legacy_preprocess(data)[0], atol=0.1)
+
+# This test checks that an image with too many pixels is rejected from its header alone.
+def test_preprocess_rejects_oversize_image():
+    buffer = io.BytesIO()
+    Image.new("RGB", (400, 300)).save(buffer, format="PNG")
+
+    with pytest.raises(ImageTooLarge):
+        preprocess_image(buffer.getvalue(), max_pixels=100 * 100)
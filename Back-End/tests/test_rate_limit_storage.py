@@ -0,0 +1,92 @@
+import multiprocessing
+import pytest
+import logging
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter, SlidingWindowCounterRateLimiter
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+from slowapi.util import get_remote_address
+from rateLimiter import CountingLimiter
+from services.rate_limit_storage import SQLiteStorage
+
+logger = logging.getLogger(__name__)
+
+# Fixture to create a SQLite storage in a temporary file
+@pytest.fixture
+def storage_uri(tmp_path):
+    return f"sqlite:///{tmp_path / 'ratelimits.db'}"
+
+# This test checks that sqlite:// URIs resolve to the SQLite storage (the way slowapi creates it from RATE_LIMIT_STORAGE_URI).
+def test_sqlite_scheme_registered(storage_uri):
+    storage = storage_from_string(storage_uri)
+
+    assert isinstance(storage, SQLiteStorage)
+    assert storage.check()
+
+# This test checks the fixed window counters: increment, expiry and clear.
+def test_fixed_window(storage_uri):
+    storage = SQLiteStorage(storage_uri)
+    limiter = FixedWindowRateLimiter(storage)
+    limit = parse("3/minute")
+
+    assert all(limiter.hit(limit, "127.0.0.1", "/login") for _ in range(3))
+    assert not limiter.hit(limit, "127.0.0.1", "/login")
+    assert limiter.hit(limit, "127.0.0.2", "/login") # Other clients have their own counter
+    assert storage.get_expiry(limit.key_for("127.0.0.1", "/login")) > 0
+
+    limiter.clear(limit, "127.0.0.1", "/login")
+    assert limiter.hit(limit, "127.0.0.1", "/login")
+
+# This test checks that the sliding window counter rejects hits beyond the limit and reports the window stats.
+def test_sliding_window_counter(storage_uri):
+    storage = SQLiteStorage(storage_uri)
+    limiter = SlidingWindowCounterRateLimiter(storage)
+    limit = parse("5/minute")
+
+    results = [limiter.hit(limit, "127.0.0.1", "/predict") for _ in range(7)]
+    stats = limiter.get_window_stats(limit, "127.0.0.1", "/predict")
+    logger.info(f"Hits: {results}, window stats: {stats}")
+
+    assert results == [True] * 5 + [False] * 2
+    assert stats.remaining == 0
+
+def hit_many(storage_uri: str, count: int, results):
+    limiter = SlidingWindowCounterRateLimiter(storage_from_string(storage_uri))
+    limit = parse("50/minute")
+    results.put(sum(limiter.hit(limit, "127.0.0.1", "/predict") for _ in range(count)))
+
+# This test checks that worker processes sharing the file share the limit, instead of each getting its own.
+def test_limit_shared_between_processes(storage_uri):
+    SQLiteStorage(storage_uri) # Create the table before the workers start
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    workers = [context.Process(target=hit_many, args=(storage_uri, 40, results)) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=60)
+    allowed = sum(results.get(timeout=5) for _ in workers)
+    logger.info(f"Requests allowed across 3 workers: {allowed}")
+
+    assert allowed == 50
+
+# This test checks that the limiter counts the allowed and rejected requests per route, a request that fails in the route still counts as allowed.
+def test_route_counters():
+    limiter = CountingLimiter(key_func=get_remote_address, storage_uri="memory://")
+    app = FastAPI()
+    app.state.limiter = limiter
+
+    @app.get("/limited")
+    @limiter.limit("3/minute")
+    async def limited(request: Request, fail: bool = False):
+        if fail:
+            raise HTTPException(status_code=400, detail="Failed")
+        return {}
+
+    client = TestClient(app)
+    codes = [client.get("/limited", params={"fail": i == 0}).status_code for i in range(5)]
+
+    assert codes == [400, 200, 200, 429, 429]
+    assert limiter.stats()["routes"] == {"/limited": {"allowed": 3, "rejected": 2}}
+
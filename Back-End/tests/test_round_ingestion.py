@@ -0,0 +1,110 @@
+import json
+import pytest
+from pydantic import ValidationError
+import logging
+from fastapi.encoders import jsonable_encoder
+from models.TrainingRound import TrainingRound
+from services.round_ingestion import ingest_rounds, ingest_ndjson, iter_lines, backfill_client_metrics, NDJSONError
+
+logger = logging.getLogger(__name__)
+
+# This test checks that an upsert writes and returns only the rounds that are new or changed.
+@pytest.mark.asyncio
+async def test_upsert_returns_delta(scratch_db, training_round):
+    first = await ingest_rounds(scratch_db, [training_round(1), training_round(2)])
+    second = await ingest_rounds(scratch_db, [training_round(1), training_round(2, global_f1=0.9), training_round(3)])
+    logger.info(f"Second push delta: {second}")
+
+    assert [document["round"] for document in first] == ["1", "2"]
+    assert sorted(document["round"] for document in second) == ["2", "3"]
+    assert await scratch_db["Rounds"].count_documents({}) == 3
+    assert (await scratch_db["Rounds"].find_one({"round_number": 2}))["Global"]["f1"] == 0.9
+    assert await ingest_rounds(scratch_db, [training_round(1)]) == [] # Nothing changed
+
+# This test checks that a changed round keeps its _id and the date it was first stored.
+@pytest.mark.asyncio
+async def test_upsert_keeps_id_and_created_at(scratch_db, training_round):
+    await ingest_rounds(scratch_db, [training_round(1)])
+    before = await scratch_db["Rounds"].find_one({"round_number": 1})
+    await ingest_rounds(scratch_db, [training_round(1, global_f1=0.7)])
+    after = await scratch_db["Rounds"].find_one({"round_number": 1})
+
+    assert after["_id"] == before["_id"]
+    assert after["created_at"] == before["created_at"]
+
+# This test checks that a replacement swaps in the new rounds with the indexes and leaves no staging collection behind.
+@pytest.mark.asyncio
+async def test_replace_swaps_collection(scratch_db, training_round):
+    await ingest_rounds(scratch_db, [training_round(1), training_round(2)])
+    delta = await ingest_rounds(scratch_db, [training_round(2), training_round(3)], mode="replace")
+
+    assert [document["round"] for document in delta] == ["3"]
+    assert sorted(await scratch_db["Rounds"].distinct("round_number")) == [2, 3]
+    assert sorted(await scratch_db["ClientMetrics"].distinct("round_number")) == [2, 3]
+    assert "round_number_unique" in await scratch_db["Rounds"].index_information()
+    assert not [name for name in await scratch_db.list_collection_names() if name.startswith("Rounds_staging")]
+
+# Async stream of byte chunks, like request.stream()
+async def chunked(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+# This test checks that a round that is not a whole number written the usual way is rejected by the model (a 422 from /post) instead of failing the upsert.
+def test_round_must_be_a_number():
+    assert TrainingRound(round="12", Global={}).round == "12"
+    assert TrainingRound(round="0", Global={}).round == "0"
+    for round in ("final", "1.5", "1_0", " 1", "1 ", "+1", "-3", "01", "", "١"):
+        with pytest.raises(ValidationError) as error:
+            TrainingRound(round=round, Global={})
+        assert repr(round) in str(error.value)
+
+# This test checks that lines split across chunks are put back together and that overlong lines are rejected.
+@pytest.mark.asyncio
+async def test_iter_lines():
+    data = b'{"a": 1}\n{"b": 2}\r\n\n{"c": 3}'
+    lines = [line async for line in iter_lines(chunked(data, 3))]
+
+    assert lines == [b'{"a": 1}', b'{"b": 2}', b'', b'{"c": 3}']
+    with pytest.raises(NDJSONError):
+        [line async for line in iter_lines(chunked(b"x" * 100, 10), max_line_bytes=50)]
+
+# This test checks that an NDJSON upload is written in batches and that invalid lines are skipped and reported.
+@pytest.mark.asyncio
+async def test_ingest_ndjson(scratch_db, training_round):
+    lines = [json.dumps(training_round(number)).encode() for number in range(1, 8)]
+    lines.insert(3, b'{"round": "4", "not_a_client": {}}')
+    lines.insert(5, b"not json")
+    lines.insert(6, b'{"round": "x7", "Global": {}}')
+    lines += [b"null", b"123", b"[1, 2]"] # Valid JSON but not a round
+
+    summary = await ingest_ndjson(scratch_db, iter_lines(chunked(b"\n".join(lines), 16)), batch_size=3)
+    logger.info(f"NDJSON ingestion summary: {summary}")
+
+    assert summary["received"] == 7
+    assert summary["changed"] == 7
+    assert summary["invalid"] == 6
+    assert [error["line"] for error in summary["errors"]] == [4, 6, 7, 11, 12, 13]
+    assert await scratch_db["Rounds"].count_documents({}) == 7
+
+# This test checks that ClientMetrics follows the rounds: one document per client and round, removed clients are deleted.
+@pytest.mark.asyncio
+async def test_client_metrics_written(scratch_db, training_round):
+    await ingest_rounds(scratch_db, [training_round(1), training_round(2)])
+    changed = jsonable_encoder(TrainingRound(round="2", Global={"f1": 0.8}, client_2={"f1": 0.4})) # client_1 left, client_2 joined
+    await ingest_rounds(scratch_db, [changed])
+
+    client_metrics = scratch_db["ClientMetrics"]
+    assert await client_metrics.count_documents({"round_number": 1}) == 2
+    assert sorted(await client_metrics.distinct("client_id", {"round_number": 2})) == ["Global", "client_2"]
+    assert (await client_metrics.find_one({"client_id": "Global", "round_number": 2}))["metrics"]["f1"] == 0.8
+
+# This test checks that ClientMetrics is filled from the rounds stored before it existed.
+@pytest.mark.asyncio
+async def test_backfill_client_metrics(scratch_db, training_round):
+    await ingest_rounds(scratch_db, [training_round(number) for number in range(1, 6)])
+    await scratch_db["ClientMetrics"].delete_many({})
+
+    await backfill_client_metrics(scratch_db, batch_size=2)
+
+    assert await scratch_db["ClientMetrics"].count_documents({}) == 10
+    assert await scratch_db["ClientMetrics"].count_documents({"client_id": "client_1"}) == 5
@@ -0,0 +1,113 @@
+import json
+import pytest
+from datetime import datetime, timedelta, timezone
+from fastapi import HTTPException
+from starlette.requests import Request
+from routes.route import parse_fields, parse_clients, page_response, stream_rounds, admin_rounds_validators
+from services.http_cache import cached_json_response, check_not_modified, rounds_data_version
+from services.round_summary import client_sort_key
+
+# Build a GET request for a path and query string with the given headers
+def request_for(path: str, query: str = "", headers: dict = {}):
+    scope = {"type": "http", "method": "GET", "scheme": "http", "server": ("testserver", 80), "root_path": "", "path": path, "query_string": query.encode()}
+    return Request({**scope, "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()]})
+
+# This test checks that /client lists Global first and then the clients in numeric order.
+def test_client_sort_key():
+    client_ids = ["client_10", "Global", "client_2", "client_1", "client_x"]
+
+    assert sorted(client_ids, key=client_sort_key) == ["Global", "client_1", "client_2", "client_10", "client_x"]
+
+# This test checks that a client with the current ETag or a recent enough date gets a 304 and the others the content,
+# and that the ETag is made for the route so two routes of the same version do not share it.
+def test_cached_json_response():
+    last_modified = datetime(2025, 5, 1, 12, 0, 0, 500000, tzinfo=timezone.utc)
+    fresh = cached_json_response(request_for("/api/client"), ["Global"], "rounds-3", last_modified)
+    etag = fresh.headers["etag"]
+
+    assert fresh.status_code == 200
+    assert etag.startswith('"rounds-3-')
+    assert fresh.headers["last-modified"] == "Thu, 01 May 2025 12:00:00 GMT"
+    assert cached_json_response(request_for("/api/summary"), {}, "rounds-3").headers["etag"] != etag
+    assert cached_json_response(request_for("/api/client", headers={"If-None-Match": etag}), ["Global"], "rounds-3").status_code == 304
+    assert cached_json_response(request_for("/api/client", headers={"If-None-Match": f'W/"rounds-2", {etag}'}), [], "rounds-3").status_code == 304
+    assert cached_json_response(request_for("/api/summary", headers={"If-None-Match": etag}), {}, "rounds-3").status_code == 200
+    assert cached_json_response(request_for("/api/client", headers={"If-None-Match": etag}), [], "rounds-4", last_modified).status_code == 200
+    assert cached_json_response(request_for("/api/client", headers={"If-Modified-Since": fresh.headers["last-modified"]}), [], "rounds-3", last_modified).status_code == 304
+    earlier = (last_modified - timedelta(hours=1)).strftime("%a, %d %b %Y %H:%M:%S GMT")
+    assert cached_json_response(request_for("/api/client", headers={"If-Modified-Since": earlier}), [], "rounds-3", last_modified).status_code == 200
+
+# This test checks that the ETag of a version differs per path and query (but not per parameter order),
+# and that the ETag of a compressed response also gives a 304.
+def test_check_not_modified():
+    etag = check_not_modified(request_for("/api/get", "limit=10&fields=f1"), "rounds-4")["ETag"]
+
+    assert etag.startswith('"rounds-4-')
+    assert check_not_modified(request_for("/api/get", "fields=f1&limit=10"), "rounds-4")["ETag"] == etag
+    assert check_not_modified(request_for("/api/get", "limit=20&fields=f1"), "rounds-4")["ETag"] != etag
+    assert check_not_modified(request_for("/api/rounds/Global", "limit=10&fields=f1"), "rounds-4")["ETag"] != etag
+    for if_none_match in (etag, f'{etag[:-1]}-gzip"', f'W/{etag[:-1]}-br"'):
+        with pytest.raises(HTTPException) as error:
+            check_not_modified(request_for("/api/get", "limit=10&fields=f1", {"If-None-Match": if_none_match}), "rounds-4")
+        assert error.value.status_code == 304
+        assert error.value.headers["ETag"] == etag
+    check_not_modified(request_for("/api/get", "limit=10&fields=f1", {"If-None-Match": etag}), "rounds-5") # New version, no 304
+
+# This test checks that the role is checked before the ETag, so a user who is not an admin gets a 403 and never a 304.
+@pytest.mark.asyncio
+async def test_admin_rounds_validators(monkeypatch):
+    async def current_version(db=None):
+        return 5, None
+    monkeypatch.setattr(rounds_data_version, "get", current_version)
+    request = request_for("/api/get", headers={"If-None-Match": "*"})
+
+    with pytest.raises(HTTPException) as error:
+        await admin_rounds_validators(request, {"role": "user"})
+    assert error.value.status_code == 403
+    with pytest.raises(HTTPException) as error:
+        await admin_rounds_validators(request, {"role": "admin"})
+    assert error.value.status_code == 304
+
+# This test checks that fields= only accepts metric names.
+def test_parse_fields():
+    assert parse_fields(None) is None
+    assert parse_fields("f1, accuracy") == ["f1", "accuracy"]
+    with pytest.raises(HTTPException) as error:
+        parse_fields("f1,password")
+    assert error.value.status_code == 400
+
+# This test checks that clients= is deduplicated and only accepts client IDs that are safe to use as field names.
+def test_parse_clients():
+    assert parse_clients("Global, client_1,client_1") == ["Global", "client_1"]
+    for clients in ("", "client_1.f1", "$where", "Global,other"):
+        with pytest.raises(HTTPException) as error:
+            parse_clients(clients)
+        assert error.value.status_code == 400
+
+# This test checks that the next page cursor is only sent when there is a next page.
+def test_page_response_cursor():
+    page = page_response([{"round_id": "1"}], 1)
+    last_page = page_response([], None)
+
+    assert page.headers["x-next-cursor"] == "1"
+    assert json.loads(page.body) == [{"round_id": "1"}]
+    assert "x-next-cursor" not in last_page.headers
+
+# Async iterator over documents, like a Motor cursor
+async def fake_cursor(documents):
+    for document in documents:
+        yield dict(document)
+
+async def export(documents, export_format, metric_names=None):
+    return "".join([chunk async for chunk in stream_rounds(fake_cursor(documents), export_format, metric_names, batch_size=2)])
+
+# This test checks that the streamed export is a valid JSON array or NDJSON, whatever the number of rounds.
+@pytest.mark.asyncio
+async def test_stream_rounds():
+    rounds = [{"round": str(number), "Global": {"f1": 0.5, "accuracy": 0.9}} for number in range(1, 6)]
+
+    assert json.loads(await export(rounds, "json")) == rounds
+    assert json.loads(await export([], "json")) == []
+    assert [json.loads(line) for line in (await export(rounds, "ndjson")).splitlines()] == rounds
+    assert await export([], "ndjson") == ""
+    assert json.loads(await export(rounds[:1], "json", ["f1"])) == [{"round": "1", "Global": {"f1": 0.5}}]
@@ -0,0 +1,80 @@
+import pytest
+import logging
+import numpy as np
+from services.round_ingestion import ingest_rounds
+from services.round_store import RoundStore, METRICS, rolling_mean, rank_descending, best_k
+
+logger = logging.getLogger(__name__)
+
+F1 = METRICS.index("f1")
+
+# Fixture to get an empty store that follows the pushes of the test
+@pytest.fixture
+def store(ingestion_listener):
+    store = RoundStore(check_interval=60)
+    ingestion_listener(store.apply)
+    return store
+
+# This test checks the rolling mean against a plain loop, with missing values ignored.
+def test_rolling_mean():
+    values = np.array([1.0, np.nan, 3.0, 4.0, np.nan, np.nan, np.nan, 8.0])
+    expected = []
+    for position in range(len(values)):
+        window = values[max(position - 2, 0):position + 1]
+        expected.append(np.nanmean(window) if (~np.isnan(window)).any() else np.nan)
+
+    assert np.allclose(rolling_mean(values, 3), expected, equal_nan=True)
+
+# This test checks that equal values share a rank and missing values have none.
+def test_rank_descending():
+    assert rank_descending(np.array([0.5, 0.9, np.nan, 0.5, 0.1])).tolist() == [2, 1, 0, 2, 4]
+
+# This test checks that the k highest values are returned best first, without the missing ones.
+def test_best_k():
+    values = np.array([0.2, np.nan, 0.9, 0.4, 0.7])
+    assert best_k(values, 3).tolist() == [2, 4, 3]
+    assert best_k(values, 10).tolist() == [2, 4, 3, 0]
+    assert best_k(np.array([np.nan]), 1).tolist() == []
+
+# This test checks the arrays loaded from the database, with NaN for the metrics that were not posted.
+@pytest.mark.asyncio
+async def test_store_loaded(scratch_db, store, training_round):
+    await ingest_rounds(scratch_db, [training_round(1, 0.5, 0.9), training_round(3, 0.8, 0.4)])
+    await store.get(scratch_db)
+    logger.info(f"Store: {store.stats()}")
+
+    assert store.round_numbers.tolist() == [1, 3]
+    assert store.client_ids == ["Global", "client_1"]
+    assert store.values[:, store.column("client_1"), F1].tolist() == [0.9, 0.4]
+    assert store.values.shape == (2, 2, len(METRICS))
+    assert store.row(2) is None
+
+# This test checks that a load in small batches gives the same arrays and that documents written during the load are skipped.
+@pytest.mark.asyncio
+async def test_store_loaded_in_batches(scratch_db, store, training_round):
+    await ingest_rounds(scratch_db, [training_round(1, 0.5, 0.9), training_round(2, 0.8, 0.4), training_round(3, 0.6, 0.7)])
+    store.load_batch_size = 2
+    await store.get(scratch_db)
+
+    assert store.values[:, store.column("Global"), F1].tolist() == [0.5, 0.8, 0.6]
+    assert store.values[:, store.column("client_1"), F1].tolist() == [0.9, 0.4, 0.7]
+    store._fill([{"client_id": "client_2", "round_number": 1, "metrics": {"f1": 0.1}}, {"client_id": "Global", "round_number": 4, "metrics": {"f1": 0.1}}])
+    assert store.client_ids == ["Global", "client_1"]
+    assert store.round_numbers.tolist() == [1, 2, 3]
+
+# This test checks that new last rounds are appended in place and that a round in the middle makes the next get() reload.
+@pytest.mark.asyncio
+async def test_store_updated_incrementally(scratch_db, store, training_round):
+    await ingest_rounds(scratch_db, [training_round(2, 0.5, 0.5)])
+    await store.get(scratch_db)
+
+    await ingest_rounds(scratch_db, [training_round(3, 0.6, 0.7), training_round(2, 0.1, 0.5)])
+    assert store.stats()["updates"] == 1
+    assert store.round_numbers.tolist() == [2, 3]
+    assert store.values[:, store.column("Global"), F1].tolist() == [0.1, 0.6]
+
+    await ingest_rounds(scratch_db, [training_round(1, 0.2, 0.2)]) # Before the last round, needs a reload
+    assert store.version is None
+    await store.get(scratch_db)
+    assert store.round_numbers.tolist() == [1, 2, 3]
+    assert store.stats()["reloads"] == 2
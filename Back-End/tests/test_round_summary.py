@@ -0,0 +1,46 @@
+import pytest
+import logging
+from services.round_ingestion import ingest_rounds
+from services.round_summary import RoundSummary
+
+logger = logging.getLogger(__name__)
+
+# Fixture to get an empty summary that follows the pushes of the test
+@pytest.fixture
+def summary(ingestion_listener):
+    summary = RoundSummary(check_interval=60)
+    ingestion_listener(summary.apply)
+    return summary
+
+# This test checks the summary built from the stored rounds: best Global round, best and latest per client, client order.
+@pytest.mark.asyncio
+async def test_summary_loaded(scratch_db, summary, training_round):
+    await ingest_rounds(scratch_db, [training_round(1, 0.5, 0.9, client_10=0.1), training_round(2, 0.8, 0.4, client_10=0.1), training_round(3, 0.6, 0.5, client_10=0.1)])
+    summary.version = None # Loaded from the database instead of the listener
+    await summary.get(scratch_db)
+    logger.info(f"Summary: {summary.as_dict()}")
+
+    assert summary.best_global()["round"] == "2"
+    assert summary.best_global()["f1"] == 0.8
+    assert summary.client_ids() == ["Global", "client_1", "client_10"]
+    assert summary.as_dict()["round_count"] == 3
+    assert summary.as_dict()["clients"]["client_1"]["best"]["round_id"] == "1"
+    assert summary.as_dict()["clients"]["client_1"]["latest"]["round_id"] == "3"
+
+# This test checks that new rounds are added in place and that a changed round makes the next get() reload.
+@pytest.mark.asyncio
+async def test_summary_updated_incrementally(scratch_db, summary, training_round):
+    await ingest_rounds(scratch_db, [training_round(1, 0.5, 0.5, client_10=0.1)])
+    await summary.get(scratch_db)
+    version_tag = summary.version_tag
+
+    await ingest_rounds(scratch_db, [training_round(2, 0.9, 0.5, client_10=0.1)])
+    assert summary.stats()["updates"] == 1
+    assert summary.best_global()["round"] == "2"
+    assert summary.version_tag != version_tag
+
+    await ingest_rounds(scratch_db, [training_round(2, 0.1, 0.5, client_10=0.1)]) # The best round got worse, needs a reload
+    assert summary.version is None
+    await summary.get(scratch_db)
+    assert summary.best_global()["round"] == "1"
+    assert summary.stats()["reloads"] == 2
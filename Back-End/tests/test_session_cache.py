@@ -0,0 +1,73 @@
+import asyncio
+import pytest
+import logging
+from fastapi import HTTPException
+from datetime import datetime, timedelta, timezone
+from starlette.requests import Request
+import routes.auth as auth
+
+logger = logging.getLogger(__name__)
+
+# Minimal stand-in for a MongoDB collection that counts find_one calls
+# It supports equality and $gt conditions, which is all get_current_user needs
+class FakeCollection:
+    def __init__(self, documents):
+        self.documents = documents
+        self.reads = 0
+
+    @staticmethod
+    def matches(doc, query):
+        for key, condition in query.items():
+            if isinstance(condition, dict):
+                if not doc.get(key) or not doc[key] > condition["$gt"]:
+                    return False
+            elif doc.get(key) != condition:
+                return False
+        return True
+
+    async def find_one(self, query):
+        self.reads += 1
+        return next((doc for doc in self.documents if self.matches(doc, query)), None)
+
+# Build a request carrying the session cookie
+def request_with_token(token):
+    return Request({"type": "http", "headers": [(b"cookie", f"session_token={token}".encode())]})
+
+# Fixture that points the auth module at fake Users/Sessions collections and starts with an empty cache
+@pytest.fixture
+def fake_auth_db(monkeypatch):
+    users = FakeCollection([{"_id": "u1", "username": "admin@example.com", "role": "admin"}])
+    sessions = FakeCollection([])
+    monkeypatch.setattr(auth, "get_users_collection", lambda: users)
+    monkeypatch.setattr(auth, "get_sessions_collection", lambda: sessions)
+    auth.session_cache.clear()
+    yield users, sessions
+    auth.session_cache.clear()
+
+# This test checks that a validated session is served from the cache without database reads.
+@pytest.mark.asyncio
+async def test_session_cached_after_first_lookup(fake_auth_db):
+    users, sessions = fake_auth_db
+    sessions.documents.append({"user_id": "u1", "token": "t1", "expires": datetime.now(timezone.utc) + timedelta(hours=1)})
+
+    first = await auth.get_current_user(request_with_token("t1"))
+    second = await auth.get_current_user(request_with_token("t1"))
+    logger.info(f"Reads: sessions={sessions.reads}, users={users.reads}")
+
+    assert first["username"] == second["username"] == "admin@example.com"
+    assert sessions.reads == 1
+    assert users.reads == 1
+
+# This test checks that a session is not served from the cache once it expires, even within the cache TTL.
+@pytest.mark.asyncio
+async def test_session_cache_respects_expiry(fake_auth_db):
+    users, sessions = fake_auth_db
+    sessions.documents.append({"user_id": "u1", "token": "t1", "expires": datetime.now(timezone.utc) + timedelta(seconds=0.2)})
+    await auth.get_current_user(request_with_token("t1"))
+
+    await asyncio.sleep(0.3)
+    with pytest.raises(HTTPException) as exc_info:
+        await auth.get_current_user(request_with_token("t1"))
+
+    assert exc_info.value.status_code == 401
+    assert sessions.reads == 2 # The second call went back to the database
@@ -1,5 +1,5 @@
 import { useState, useEffect, useCallback } from 'react';
-import { fetchTrainingMetrics } from '../services/api';
+import { fetchTrainingMetrics, subscribeToRounds } from '../services/api';
 
 // Used in ClientsPage.jsx & ClientOverview.jsx
 export function usePerformanceData(selectedClient = '', showAll = false) {
@@ -15,6 +15,18 @@ export function usePerformanceData(selectedClient = '', showAll = false) {
     }
   }, [selectedClient]);
 
+  // Keep the data up to date while the page is open, instead of polling
+  // New or changed rounds are merged in, a resync fetches everything again
+  useEffect(() => {
+    if (!selectedClient) {
+      return;
+    }
+    return subscribeToRounds(
+      (rounds) => mergeRounds(selectedClient, rounds),
+      () => fetchData(selectedClient)
+    );
+  }, [selectedClient]);
+
   // Set the data and chart data when selectedClient changes
   // This function fetches the training metrics data for the selected client
   const fetchData = async (clientId) => {
@@ -32,6 +44,25 @@ export function usePerformanceData(selectedClient = '', showAll = false) {
     }
   };
 
+  // Merge the rounds of a push into the data, in the format of /rounds/{client_id}
+  // Rounds without this client are ignored, a round that is already shown is replaced
+  const mergeRounds = (clientId, rounds) => {
+    const pushed = rounds
+      .filter((round) => round[clientId])
+      .map((round) => ({ round_id: round.round, metrics: round[clientId], created_at: round.created_at }));
+    if (pushed.length === 0) {
+      return;
+    }
+    const merge = (current, descending) => {
+      const byRound = new Map(current.map((round) => [round.round_id, round]));
+      pushed.forEach((round) => byRound.set(round.round_id, round));
+      const sign = descending ? -1 : 1;
+      return [...byRound.values()].sort((a, b) => sign * (Number(a.round_id) - Number(b.round_id)));
+    };
+    setData((current) => merge(current, true));
+    setChartData((current) => merge(current, false));
+  };
+
   // Return the sliced fetched data based on the showAll flag
   // If showAll is true, return all data; otherwise, return the last 10 rounds
   // showAll is true when on the ClientsPage.jsx
@@ -13,12 +13,31 @@ export const fetchUniqueClientIds = async () => {
 
 // Fetch Training Metrics for a specific round
 // This function is used to fetch the training metrics for a specific client from the API
+// The rounds are returned one page at a time, the X-Next-Cursor header gives the start of the next page
 export const fetchTrainingMetrics = async (clientId, order) => {
-  const response = await fetch(`${API_URL}/rounds/${clientId}?order=${order}`);
-  if (!response.ok) {
-    throw new Error('Failed to fetch client rounds');
-  }
-  return response.json();
+  const rounds = [];
+  let cursor = null;
+  do {
+    const after = cursor === null ? '' : `&after=${cursor}`;
+    const response = await fetch(`${API_URL}/rounds/${clientId}?order=${order}${after}`);
+    if (!response.ok) {
+      throw new Error('Failed to fetch client rounds');
+    }
+    rounds.push(...(await response.json()));
+    cursor = response.headers.get('X-Next-Cursor');
+  } while (cursor !== null);
+  return rounds;
+};
+
+// Subscribe to new rounds
+// Opens a Server-Sent Events stream, onRounds gets the rounds that were added or changed by each push
+// onResync is called when the rounds should be fetched again (rounds replaced, or events missed)
+// The browser reconnects by itself, returns a function that closes the stream
+export const subscribeToRounds = (onRounds, onResync) => {
+  const source = new EventSource(`${API_URL}/events`, { withCredentials: true });
+  source.addEventListener('rounds', (event) => onRounds(JSON.parse(event.data).rounds));
+  source.addEventListener('resync', () => onResync());
+  return () => source.close();
 };
 
 // Fetch Best F1 Global Metrics